@@ -1,7 +1,9 @@
 import io
+import time
 
+import matplotlib.pyplot as plt
+import numpy as np
 import streamlit as st
-from streamlit_autorefresh import st_autorefresh
 
 import rgs
 import viz
@@ -20,54 +22,107 @@ import recurrencia_viz
 # El estado de la app se maneja con st.session_state.
 # -------------------------------------------------------------------
 
+# Máximo n para el que se dibuja la rejilla con todas las particiones
+# (B(7) = 877 subplots; a partir de ahí la figura es inmanejable).
+LIMITE_N_DIBUJO = 7
+
+# Segundos entre dos pasos de la animación del árbol
+INTERVALO_ANIMACION = 0.8
+
 
 # ------------------------------------------
 # Inicialización de estado
 # ------------------------------------------
+@st.cache_resource(show_spinner=False)
+def _precalentar() -> bool:
+    """
+    Paga al arrancar el proceso los costes de primera vez: caché de fuentes
+    y backend de matplotlib (primer texto dibujado) y primera llamada a los
+    constructores NumPy de RGS.
+
+    Al ser un cache_resource se ejecuta una sola vez por proceso, no en
+    cada rerun ni en cada sesión.
+    """
+    codes, _ = rgs.rgs_all_array(3)
+    viz.rasterizar_atlas(codes, tile_px=60)
+    fig, _ = recurrencia_viz.dibujar_arbol_recurrencia(2, 1)
+    fig.canvas.draw()
+    return True
+
+
+# Valores por defecto de st.session_state
+_ESTADO_INICIAL = {
+    # Número de particiones de la última generación (None = sin generar).
+    # Las particiones en sí solo se enumeran al dibujar la rejilla.
+    "partition_total": None,
+    # Modo de enumeración usado en la última generación.
+    "partition_mode": None,
+    # Índice de la partición actualmente mostrada.
+    "current_index": 0,
+    # Valores de n y k (si aplica) usados para generar las particiones.
+    "current_n": None,
+    "current_k": None,
+    # Parámetros por defecto para el árbol de recurrencia S(n, k)
+    "tree_n": 4,
+    "tree_k": 2,
+    # Paso actual de la animación del árbol (nodo máximo visible).
+    "tree_step": 0,
+    # Bandera para activar/desactivar auto-play del árbol.
+    "tree_anim_play": False,
+    # Animación en curso: instante (time.monotonic) y paso en que empezó,
+    # y último paso. tree_anim_t0 es None si aún no ha empezado.
+    "tree_anim_t0": None,
+    "tree_anim_desde": 0,
+    "tree_anim_ultimo": 0,
+}
+
+
 def init_session_state():
     """
-    Inicializa claves en st.session_state con valores por defecto.
+    Inicializa claves en st.session_state con valores por defecto
+    (_ESTADO_INICIAL), sin tocar las que ya existen.
 
     Estas claves se usan para:
-      - Guardar la lista de particiones generadas.
+      - Guardar cuántas particiones hay para los parámetros elegidos.
       - Recordar el índice actual de la partición mostrada.
       - Guardar parámetros n, k de la enumeración.
       - Controlar los parámetros y animación del árbol de recurrencia.
     """
-    if "partitions" not in st.session_state:
-        # Lista de particiones actuales (cada partición es lista de bloques).
-        st.session_state["partitions"] = []
-    if "partition_mode" not in st.session_state:
-        # Modo de enumeración usado en la última generación ("all" / "exact").
-        st.session_state["partition_mode"] = None
-    if "current_index" not in st.session_state:
-        # Índice de la partición actualmente mostrada.
-        st.session_state["current_index"] = 0
-    if "current_n" not in st.session_state:
-        # Valor de n usado para generar las particiones.
-        st.session_state["current_n"] = None
-    if "current_k" not in st.session_state:
-        # Valor de k (si aplica) usado para generar las particiones.
-        st.session_state["current_k"] = None
-    # Parámetros por defecto para el árbol de recurrencia S(n, k)
-    if "tree_n" not in st.session_state:
-        st.session_state["tree_n"] = 4
-    if "tree_k" not in st.session_state:
-        st.session_state["tree_k"] = 2
-    if "tree_step" not in st.session_state:
-        # Paso actual de la animación del árbol (nodo máximo visible).
-        st.session_state["tree_step"] = 0
-    if "tree_anim_play" not in st.session_state:
-        # Bandera para activar/desactivar auto-play del árbol.
-        st.session_state["tree_anim_play"] = False
+    for clave, valor in _ESTADO_INICIAL.items():
+        st.session_state.setdefault(clave, valor)
 
 
 # ------------------------------------------
 # Lógica para generar particiones
 # ------------------------------------------
+@st.cache_data(max_entries=32, show_spinner=False)
+def _enumerar_particiones(n: int, modo: str, k: int | None):
+    """
+    Enumera las particiones de {1..n} para el modo dado y las ordena
+    por número de bloques.
+
+    Devuelve (codes, k_per): matriz int8 (M, n) con una RGS por fila y
+    vector int8 con el número de bloques de cada una. Un solo arreglo
+    contiguo ocupa mucho menos que M listas de listas y ordenar por
+    número de bloques es un argsort.
+
+    El resultado se cachea por (n, modo, k): repetir una configuración ya
+    vista no vuelve a ejecutar el generador RGS.
+    """
+    if modo == "Todas las particiones de {1..n}":
+        codes, k_per = rgs.rgs_all_array(n)
+    elif modo == "Exactamente k bloques" and k is not None:
+        codes, k_per = rgs.rgs_exactly_array(n, k)
+    else:
+        return np.zeros((0, n), dtype=np.int8), np.zeros(0, dtype=np.int8)
+
+    orden = np.argsort(k_per, kind="stable")
+    return codes[orden], k_per[orden]
+
+
 def generar_particiones(n: int, modo: str, k: int | None = None):
     """
-    Genera y guarda en session_state las particiones de {1..n}.
+    Registra en session_state los parámetros de las particiones de {1..n}.
 
     Parámetros:
         n   : tamaño del conjunto {1..n}.
@@ -77,27 +132,281 @@ def generar_particiones(n: int, modo: str, k: int | None = None):
         k   : número de bloques (solo se usa si el modo requiere k).
 
     Efectos:
-        - Actualiza st.session_state["partitions"] con la lista de particiones.
-        - Reinicia el índice actual a 0.
-        - Guarda n y k usados.
+        - Guarda en st.session_state["partition_total"] cuántas particiones
+          hay (B(n) o S(n, k), por fórmula: no se enumera ninguna).
+        - Guarda n, modo y k usados.
+
+    La enumeración completa se hace más tarde y solo si se pide dibujar la
+    rejilla (n <= LIMITE_N_DIBUJO); con n grande "Generar" es instantáneo y
+    no reserva memoria para B(n) particiones.
     """
     if modo == "Todas las particiones de {1..n}":
-        partes = list(rgs.rgs_all(n, yield_blocks=True))
-        partes.sort(key=len)
-    elif modo == "Exactamente k bloques":
-        if k is None:
-            partes = []
-        else:
-            partes = list(rgs.rgs_exactly(n, k, yield_blocks=True))
-            partes.sort(key=len)
+        total = rgs.rgs_count(n)
+    elif modo == "Exactamente k bloques" and k is not None:
+        total = rgs.rgs_count(n, k)
     else:
-        partes = []
-
-    st.session_state["partitions"] = partes
+        total = 0
+    st.session_state["partition_total"] = total
+    st.session_state["partition_mode"] = modo
     st.session_state["current_n"] = n
     st.session_state["current_k"] = k
 
 
+# ------------------------------------------
+# Renderizado de figuras
+# ------------------------------------------
+@st.cache_resource(max_entries=16, show_spinner="Dibujando particiones...")
+def _png_rejilla(n: int, modo: str, k: int | None) -> bytes:
+    """
+    PNG con la rejilla de todas las particiones para (n, modo, k).
+
+    La rejilla se rasteriza directamente desde las RGS como un atlas de
+    píxeles (viz.rasterizar_atlas) y se codifica una sola vez; esos mismos
+    bytes se muestran con st.image y se ofrecen en el botón de descarga.
+
+    Solo se dibuja cuando el usuario lo pide; volver a mostrarla (o a
+    cambiar entre configuraciones ya dibujadas) no pasa por matplotlib.
+    """
+    codes, _ = _enumerar_particiones(n, modo, k)
+    atlas = viz.rasterizar_atlas(codes)
+
+    buffer = io.BytesIO()
+    plt.imsave(buffer, atlas, format="png")
+    return buffer.getvalue()
+
+
+# ------------------------------------------
+# Vista del árbol de recurrencia
+# ------------------------------------------
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _traza_arbol(n: int, k: int):
+    """
+    Traza (nodos, aristas, posiciones) del árbol de S(n, k).
+
+    Solo depende de (n, k): se construye una vez y mover el slider o
+    avanzar la animación únicamente cambia cuántos nodos se dibujan.
+    Es un cache_resource (se devuelve el mismo objeto, sin copiarlo en
+    cada rerun), así que la traza se trata como de solo lectura.
+    """
+    return recurrencia_viz.build_recurrence_trace(n, k)
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _dag_arbol(n: int, k: int):
+    """
+    Traza compacta de S(n, k): un nodo por llamada distinta (ver
+    recurrencia_viz.build_recurrence_dag), más la multiplicidad de cada
+    nodo. De solo lectura, como _traza_arbol.
+    """
+    nodes, edges, posiciones = recurrencia_viz.build_recurrence_dag(n, k)
+    multiplicidades = recurrencia_viz.multiplicidades_dag(nodes, edges)
+    return nodes, edges, posiciones, multiplicidades
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _svg_arbol(n: int, k: int, compacta: bool = False) -> str:
+    """
+    Árbol completo de S(n, k) como SVG, con un grupo "paso-i" por nodo; si
+    compacta, el grafo de llamadas distintas con su multiplicidad.
+
+    Se dibuja una sola vez por (n, k, compacta); el slider y la animación
+    solo cambian qué nodos del mismo SVG se ven.
+    """
+    if compacta:
+        nodes, edges, posiciones, multiplicidades = _dag_arbol(n, k)
+        return recurrencia_viz.render_svg(
+            nodes, edges, posiciones,
+            titulo=f"Llamadas distintas de S({n},{k})",
+            multiplicidades=multiplicidades,
+        )
+    nodes, edges, posiciones = _traza_arbol(n, k)
+    return recurrencia_viz.render_svg(nodes, edges, posiciones)
+
+
+# Árbol en el navegador: el nodo i es el i-ésimo hijo de #arbol-nodos,
+# la arista j (que llega al nodo j + 1) el j-ésimo de #arbol-aristas y las
+# etiquetas son grupos "paso-i-etiqueta". Se muestran los elementos con
+# paso <= actual y, si el último paso es posterior, se avanza cada
+# INTERVALO ms hasta él, sin reruns.
+_PLANTILLA_ARBOL = """
+<div id="arbol">__SVG__</div>
+<script>
+  const hijos = (sel) => Array.from(document.querySelectorAll(sel + " > :not(defs)"));
+  const elementos = [
+    ...hijos("#arbol-nodos").map((e, i) => [e, i]),
+    ...hijos("#arbol-aristas").map((e, j) => [e, j + 1]),
+    ...Array.from(document.querySelectorAll('#arbol g[id^="paso-"]'))
+      .map((e) => [e, parseInt(e.id.split("-")[1], 10)]),
+  ];
+  const ultimo = __ULTIMO__;
+  let paso = __PASO__;
+  function mostrar() {
+    elementos.forEach(([e, i]) => { e.style.visibility = i <= paso ? "visible" : "hidden"; });
+  }
+  mostrar();
+  if (paso < ultimo) {
+    const timer = setInterval(() => {
+      paso += 1;
+      mostrar();
+      if (paso >= ultimo) { clearInterval(timer); }
+    }, __INTERVALO__);
+  }
+</script>
+"""
+
+
+def _mostrar_arbol(svg: str, paso: int, ultimo: int):
+    """
+    Muestra el SVG de un árbol (ver _svg_arbol) con los nodos hasta `paso`
+    visibles y, si ultimo > paso, lo anima en el navegador hasta `ultimo`.
+
+    La vista con slider, la compacta y la animación usan el mismo SVG:
+    Python no vuelve a dibujar nada al mover el slider ni durante la
+    animación (solo _vigilar_animacion comprueba cuándo termina).
+    """
+    html = (
+        _PLANTILLA_ARBOL
+        .replace("__SVG__", svg)
+        .replace("__PASO__", str(paso))
+        .replace("__ULTIMO__", str(ultimo))
+        .replace("__INTERVALO__", str(int(INTERVALO_ANIMACION * 1000)))
+    )
+    st.iframe(html, height=460)
+
+
+def _paso_animacion() -> int:
+    """
+    Paso que está mostrando la animación del navegador.
+
+    El script de la animación no devuelve nada a Python, así que el paso
+    se deduce del instante y el paso en que empezó y del intervalo fijo
+    entre pasos, sin pasar del último nodo.
+    """
+    transcurrido = time.monotonic() - st.session_state["tree_anim_t0"]
+    paso = st.session_state["tree_anim_desde"] + int(transcurrido / INTERVALO_ANIMACION)
+    return min(paso, st.session_state["tree_anim_ultimo"])
+
+
+def _detener_animacion():
+    """Para el auto-play y deja el slider en el paso al que llegó la animación."""
+    if st.session_state["tree_anim_t0"] is not None:
+        st.session_state["tree_step"] = _paso_animacion()
+    st.session_state["tree_anim_play"] = False
+    st.session_state["tree_anim_t0"] = None
+
+
+def _cancelar_animacion():
+    """
+    Para el auto-play si estaba activo cuando la animación no es lo que se
+    muestra, y vuelve a ejecutar la app entera para que _vigilar_animacion
+    deje de programarse.
+    """
+    if st.session_state["tree_anim_play"]:
+        _detener_animacion()
+        st.rerun()
+
+
+@st.fragment(run_every=INTERVALO_ANIMACION)
+def _vigilar_animacion():
+    """
+    Mientras se reproduce la animación, comprueba cada intervalo si ya ha
+    llegado al último nodo; entonces la detiene y vuelve a ejecutar la app
+    para mostrar el slider en ese paso (como Pause, pero automático).
+
+    main solo lo programa con el auto-play activo; si se para sin un rerun
+    de la app entera, el siguiente intervalo hace ese rerun y deja de
+    ejecutarse.
+    """
+    if not st.session_state["tree_anim_play"] or st.session_state["tree_anim_t0"] is None:
+        st.rerun()
+    if _paso_animacion() >= st.session_state["tree_anim_ultimo"]:
+        _detener_animacion()
+        st.rerun()
+
+
+@st.fragment
+def _fragmento_arbol():
+    """
+    Dibuja el árbol de S(n, k) hasta el paso actual o, con el auto-play
+    activo, lanza la animación en el navegador.
+
+    Se ejecuta como st.fragment: mover el slider re-ejecuta solo esta
+    función, no todo el script.
+    """
+    n_tree = st.session_state["tree_n"]
+    k_tree = st.session_state["tree_k"]
+    step = st.session_state["tree_step"]
+
+    # El árbol completo solo se dibuja si es pequeño; se cuenta sin construirlo
+    total_arbol = recurrencia_viz.contar_nodos_arbol(n_tree, k_tree)
+    arbol_grande = total_arbol > recurrencia_viz.MAX_NODOS_ARBOL
+    compacta = st.toggle(
+        "Vista compacta (una vez cada llamada distinta)",
+        key="tree_dag",
+        disabled=arbol_grande,
+    )
+
+    if arbol_grande or compacta:
+        # Grafo de llamadas distintas: O(n·k) nodos, se dibuja para
+        # cualquier n, pero completo (no hay nada que animar)
+        _cancelar_animacion()
+        if arbol_grande:
+            st.info(
+                f"El árbol completo de S({n_tree},{k_tree}) tiene {total_arbol} nodos "
+                f"(más de {recurrencia_viz.MAX_NODOS_ARBOL}): se muestra cada llamada "
+                "S(n', k') una sola vez."
+            )
+        distintas = len(_dag_arbol(n_tree, k_tree)[0])
+        st.write(
+            f"Llamadas distintas: {distintas} "
+            f"(el árbol completo tiene {total_arbol} nodos)"
+        )
+        _mostrar_arbol(_svg_arbol(n_tree, k_tree, compacta=True), distintas - 1, distintas - 1)
+        return
+
+    total_nodes = len(_traza_arbol(n_tree, k_tree)[0])
+
+    if st.session_state["tree_anim_play"]:
+        if st.session_state["tree_anim_t0"] is None:
+            # Empieza ahora, desde el paso actual del slider
+            st.session_state["tree_anim_t0"] = time.monotonic()
+            st.session_state["tree_anim_desde"] = min(step, total_nodes - 1)
+            st.session_state["tree_anim_ultimo"] = total_nodes - 1
+
+        paso = _paso_animacion()
+        if paso < total_nodes - 1:
+            # Si el fragmento se vuelve a ejecutar a mitad, se sigue desde
+            # el paso en que iba la animación
+            _mostrar_arbol(_svg_arbol(n_tree, k_tree), paso, total_nodes - 1)
+            st.write(f"Número total de nodos en el árbol: {total_nodes}")
+            return
+        # Ya en el último nodo: no hay nada que animar
+        _cancelar_animacion()
+
+    # Hueco para la figura: se dibuja después de leer el slider, para que
+    # muestre ya el paso elegido en esta misma ejecución.
+    hueco_figura = st.empty()
+
+    st.write(f"Número total de nodos en el árbol: {total_nodes}")
+
+    # Slider para moverse manualmente por la animación del árbol
+    # (con un solo nodo no hay pasos entre los que moverse)
+    if total_nodes > 1:
+        step = st.slider(
+            "Paso de animación (nodo máximo visible)",
+            min_value=0,
+            max_value=total_nodes - 1,
+            value=min(step, total_nodes - 1),
+        )
+        st.session_state["tree_step"] = step
+
+    # Mostrar el árbol hasta el nodo con índice = step: el SVG ya está
+    # dibujado y el navegador solo oculta los nodos posteriores
+    paso = min(step, total_nodes - 1)
+    with hueco_figura:
+        _mostrar_arbol(_svg_arbol(n_tree, k_tree), paso, paso)
+
+
 # ------------------------------------------
 # App principal
 # ------------------------------------------
@@ -111,6 +420,7 @@ def main():
       - Árbol de recurrencia S(n, k).
     """
     st.set_page_config(page_title="Simulación de Particiones", layout="wide")
+    _precalentar()
     init_session_state()
 
     # ---------------- Sidebar ----------------
@@ -126,151 +436,145 @@ def main():
 
         if vista == "Visualización de particiones":
 
-            # Parámetro n para el conjunto {1..n}
-            n = st.number_input(
-                "Tamaño del conjunto n",
-                min_value=0,
-                max_value=12,
-                value=5,
-                step=1,
-            )
-
-            # Modo de enumeración (todas / exactamente k bloques)
+            # Modo de enumeración (todas / exactamente k bloques).
+            # Queda fuera del formulario para que el campo k aparezca o
+            # desaparezca en cuanto se cambia el modo.
             modo = st.selectbox(
                 "Modo de enumeración",
                 ["Todas las particiones de {1..n}", "Exactamente k bloques"],
             )
 
-            k = None
-            if modo == "Exactamente k bloques":
-                # Solo tiene sentido k entre 0 y n
-                k = st.number_input(
-                    "Número de bloques k",
+            # Los parámetros van en un formulario: editarlos no provoca
+            # reruns, solo el botón de envío.
+            with st.form("form_particiones"):
+                # Parámetro n para el conjunto {1..n}
+                n = st.number_input(
+                    "Tamaño del conjunto n",
                     min_value=0,
-                    max_value=int(n),
-                    value=min(2, int(n)),
+                    max_value=12,
+                    value=5,
                     step=1,
                 )
 
-            st.markdown("---")
-
-            # Botón para generar (o regenerar) particiones
-            if st.button("Generar particiones"):
-                generar_particiones(int(n), modo, int(k) if k is not None else None)
+                k = None
+                if modo == "Exactamente k bloques":
+                    # Solo tiene sentido k entre 0 y n (se valida al enviar,
+                    # ya que dentro del formulario el máximo no sigue a n)
+                    k = st.number_input(
+                        "Número de bloques k",
+                        min_value=0,
+                        max_value=12,
+                        value=2,
+                        step=1,
+                    )
+
+                # Botón para generar (o regenerar) particiones
+                generar = st.form_submit_button("Generar particiones")
+
+            if generar:
+                if k is not None and k > n:
+                    st.error("k debe ser menor o igual que n.")
+                else:
+                    generar_particiones(int(n), modo, int(k) if k is not None else None)
 
         else:
             # Controles de la vista del árbol de recurrencia
-            st.markdown("### Parámetros de S(n, k)")
-            tree_n = st.number_input(
-                "n (tamaño del conjunto)",
-                min_value=1,
-                max_value=12,
-                value=4,
-                step=1,
-            )
-            tree_k = st.number_input(
-                "k (número de bloques)",
-                min_value=0,
-                max_value=int(tree_n),
-                value=2,
-                step=1,
-            )
+            with st.form("form_arbol"):
+                st.markdown("### Parámetros de S(n, k)")
+                tree_n = st.number_input(
+                    "n (tamaño del conjunto)",
+                    min_value=1,
+                    max_value=12,
+                    value=4,
+                    step=1,
+                )
+                tree_k = st.number_input(
+                    "k (número de bloques)",
+                    min_value=0,
+                    max_value=12,
+                    value=2,
+                    step=1,
+                )
+
+                mostrar = st.form_submit_button("Mostrar árbol")
 
-            if st.button("Mostrar árbol"):
-                # Guardamos n y k elegidos para redibujar el árbol
-                st.session_state["tree_n"] = int(tree_n)
-                st.session_state["tree_k"] = int(tree_k)
+            if mostrar:
+                if tree_k > tree_n:
+                    st.error("k debe ser menor o igual que n.")
+                else:
+                    # Guardamos n y k elegidos para redibujar el árbol
+                    st.session_state["tree_n"] = int(tree_n)
+                    st.session_state["tree_k"] = int(tree_k)
+                    # Una animación en curso vuelve a empezar con el nuevo árbol
+                    st.session_state["tree_anim_t0"] = None
 
             st.markdown("### Animación del árbol")
 
-            # Botones para activar/pausar el auto-play del árbol
+            # Botones para activar/pausar el auto-play del árbol. Solo se
+            # anima el árbol completo: no la vista compacta ni un árbol
+            # demasiado grande para dibujarlo entero.
+            animable = not st.session_state.get("tree_dag") and (
+                recurrencia_viz.contar_nodos_arbol(
+                    st.session_state["tree_n"], st.session_state["tree_k"]
+                ) <= recurrencia_viz.MAX_NODOS_ARBOL
+            )
             col_t1, col_t2 = st.columns(2)
             with col_t1:
-                if st.button("▶️ Play árbol"):
+                if (
+                    st.button("▶️ Play árbol", disabled=not animable)
+                    and animable
+                    and not st.session_state["tree_anim_play"]
+                ):
                     st.session_state["tree_anim_play"] = True
+                    st.session_state["tree_anim_t0"] = None
             with col_t2:
                 if st.button("⏸️ Pause árbol"):
-                    st.session_state["tree_anim_play"] = False
+                    _detener_animacion()
 
     # ---------------- Contenido principal ----------------
     if vista == "Visualización de particiones":
         st.title("Simulación de particiones de un conjunto")
 
-        if not st.session_state["partitions"]:
+        total = st.session_state["partition_total"]
+        if not total:
             st.info("Genera las particiones desde la barra lateral para comenzar.")
             return
 
-        partitions = st.session_state["partitions"]
         n_actual = st.session_state["current_n"]
         k_actual = st.session_state["current_k"]
+        modo_actual = st.session_state["partition_mode"]
 
         st.subheader("Particiones generadas")
-        st.write(f"Total de particiones: `{len(partitions)}`")
+        st.write(f"Total de particiones: `{total}`")
         if k_actual is not None:
             st.write(f"Modo: particiones con exactamente `{k_actual}` bloques")
         else:
             st.write("Modo: todas las particiones de {1..n}")
 
-        limite_n = 7
-        if n_actual is not None and n_actual > limite_n:
+        if n_actual is not None and n_actual > LIMITE_N_DIBUJO:
             st.warning(
-                f"n = {n_actual} genera {len(partitions)} particiones. Reduce n (≤ {limite_n}) para evitar la explosión combinatoria al dibujarlas."
+                f"n = {n_actual} genera {total} particiones. Reduce n (≤ {LIMITE_N_DIBUJO}) para evitar la explosión combinatoria al dibujarlas."
             )
         else:
-            grid_fig = viz.dibujar_particiones_en_grid(partitions, n=n_actual)
-            st.pyplot(grid_fig, use_container_width=True)
-
-            buffer = io.BytesIO()
-            grid_fig.savefig(buffer, format="png", bbox_inches="tight", facecolor=grid_fig.get_facecolor())
-            st.download_button(
-                "Descargar figura de subplots",
-                data=buffer.getvalue(),
-                file_name=f"particiones_n{n_actual}.png",
-                mime="image/png",
-            )
+            with st.expander("Mostrar figura", expanded=True):
+                # Dibujar la rejilla es lo caro: solo se hace si se pide
+                if st.toggle("Dibujar rejilla"):
+                    grid_png = _png_rejilla(n_actual, modo_actual, k_actual)
+                    st.image(grid_png)
+
+                    st.download_button(
+                        "Descargar figura de subplots",
+                        data=grid_png,
+                        file_name=f"particiones_n{n_actual}.png",
+                        mime="image/png",
+                    )
 
     else:
         st.title("Árbol de recurrencia de S(n, k)")
 
-        n_tree = st.session_state["tree_n"]
-        k_tree = st.session_state["tree_k"]
-        step = st.session_state["tree_step"]
-
-        # Dibujar el árbol hasta el nodo con índice = step
-        fig, total_nodes = recurrencia_viz.dibujar_arbol_recurrencia(
-            n_tree, k_tree, step=step
-        )
-        st.pyplot(fig, use_container_width=False)
-
-        st.write(f"Número total de nodos en el árbol: {total_nodes}")
-
-        # Slider para moverse manualmente por la animación del árbol
-        new_step = st.slider(
-            "Paso de animación (nodo máximo visible)",
-            min_value=0,
-            max_value=max(total_nodes - 1, 0),
-            value=step,
-        )
-
-        if new_step != step:
-            st.session_state["tree_step"] = new_step
-
-        # Auto-play del árbol usando st_autorefresh
+        _fragmento_arbol()
         if st.session_state["tree_anim_play"]:
-            count = st_autorefresh(
-                interval=800,  # milisegundos entre pasos (0.8 s)
-                limit=None,
-                key="tree_autoplay_counter",
-            )
-            # Avanzamos un paso cada vez que cambia el contador
-            if st.session_state["tree_step"] < total_nodes - 1:
-                st.session_state["tree_step"] += 1
-            else:
-                # Si llegamos al último nodo, detenemos el auto-play
-                st.session_state["tree_anim_play"] = False
-        else:
-            # Si está pausado, no hacemos nada extra
-            pass
+            _vigilar_animacion()
 
 
 if __name__ == "__main__":
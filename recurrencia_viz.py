@@ -1,15 +1,21 @@
+import io
 from dataclasses import dataclass
-from typing import Optional, Dict, Tuple
+from functools import lru_cache
+from typing import Optional, Dict, List, Tuple
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
 from matplotlib.lines import Line2D
 
 import matplotlib.pyplot as plt
+import numpy as np
 
 # -------------------------------------------------------------------
 # Visualización del árbol de recurrencia para los números de Stirling
 # de segunda especie S(n, k).
 #
 # Este módulo:
-#   - Calcula S(n, k) con memoización.
+#   - Calcula S(n, k) con una tabla precalculada.
 #   - Construye el árbol de llamadas recursivas de la relación:
 #         S(n,k) = k·S(n-1,k) + S(n-1,k-1)
 #   - Asigna posiciones (x, y) a cada nodo para dibujarlo.
@@ -18,11 +24,36 @@ import matplotlib.pyplot as plt
 #         flecha derecha    → término S(n-1,k-1)
 # -------------------------------------------------------------------
 
+# El árbol completo crece como 2^n nodos: solo se dibuja si no es mayor
+# que el mayor árbol con n = MAX_N_ARBOL (ver MAX_NODOS_ARBOL).
+MAX_N_ARBOL = 8
+
 
 # ---------------------------------------------------
-# Cálculo de S(n,k) con memoización (Stirling 2ª especie)
+# Cálculo de S(n,k) con una tabla precalculada (Stirling 2ª especie)
 # ---------------------------------------------------
-_stirling_cache: Dict[Tuple[int, int], int] = {}
+# Hasta n = 25 todos los S(n,k) caben en int64 (B(25) ≈ 4.6·10^18).
+_MAX_N_TABLA = 25
+
+
+def _tabla_stirling(max_n: int) -> np.ndarray:
+    """
+    Tabla S[i, j] = S(i, j) para 0 <= j <= i <= max_n, llenada de abajo
+    hacia arriba con la recurrencia
+
+        S(i,j) = j·S(i-1,j) + S(i-1,j-1)
+
+    (una fila completa por paso, vectorizada con NumPy).
+    """
+    S = np.zeros((max_n + 1, max_n + 1), dtype=np.int64)
+    S[0, 0] = 1
+    for i in range(1, max_n + 1):
+        j = np.arange(1, i + 1)
+        S[i, 1:i + 1] = j * S[i - 1, 1:i + 1] + S[i - 1, 0:i]
+    return S
+
+
+_S = _tabla_stirling(_MAX_N_TABLA)
 
 
 def stirling_s2(n: int, k: int) -> int:
@@ -38,166 +69,179 @@ def stirling_s2(n: int, k: int) -> int:
         S(n,n) = 1
         S(n,k) = 0 si k < 0 o k > n
 
-    Se usa un diccionario global _stirling_cache para memoización.
+    Para n <= _MAX_N_TABLA el valor se lee de la tabla _S, calculada una
+    sola vez al importar el módulo; más allá se continúa la recurrencia
+    fila a fila con enteros de Python (sin desbordamiento).
     """
-    if (n, k) in _stirling_cache:
-        return _stirling_cache[(n, k)]
-
-    # Casos base estándar
-    if n == 0 and k == 0:
-        val = 1
-    elif n > 0 and k == 0:
-        val = 0
-    elif n == k:
-        val = 1
-    elif k < 0 or k > n:
-        val = 0
-    else:
-        val = k * stirling_s2(n - 1, k) + stirling_s2(n - 1, k - 1)
+    if n < 0 or k < 0 or k > n:
+        return 0
+    if n <= _MAX_N_TABLA:
+        return int(_S[n, k])
 
-    _stirling_cache[(n, k)] = val
-    return val
+    fila = [int(v) for v in _S[_MAX_N_TABLA]]
+    for i in range(_MAX_N_TABLA + 1, n + 1):
+        fila = [0] + [j * fila[j] + fila[j - 1] for j in range(1, i)] + [1]
+    return fila[k]
 
 
 def es_caso_base(n: int, k: int) -> bool:
     """
-    Indica si (n, k) corresponde a uno de los casos base de S(n, k).
+    Indica si (n, k) corresponde a uno de los casos base de S(n, k):
+    S(0,0), S(n,0), S(n,n) o k fuera de [0, n]. Equivale a que k no
+    esté estrictamente entre 0 y n (único caso en que se recurre).
     """
-    if n == 0 and k == 0:
-        return True
-    if n > 0 and k == 0:
-        return True
-    if n == k:
-        return True
-    if k < 0 or k > n:
-        return True
-    return False
-
+    return not (0 < k < n)
 
-# ---------------------------------------------------
-# Estructura de nodo para el árbol de llamadas
-# ---------------------------------------------------
-@dataclass
-class RecNode:
-    """
-    Nodo del árbol de llamadas de la recurrencia S(n,k).
 
-    Atributos:
-        n, k   : parámetros de la llamada S(n, k).
-        depth  : profundidad en el árbol (raíz tiene depth = 0).
-        left   : hijo izquierdo (S(n-1, k)).
-        right  : hijo derecho (S(n-1, k-1)).
-        x, y   : posición asignada para dibujar el nodo.
-        idx    : índice asignado en preorden (para animación).
+def _es_caso_base_array(ns: np.ndarray, ks: np.ndarray) -> np.ndarray:
     """
-    n: int
-    k: int
-    depth: int
-    left: Optional["RecNode"] = None
-    right: Optional["RecNode"] = None
-    x: float = 0.0
-    y: float = 0.0
-    idx: int = -1
-
-
-def _build_call_tree(n: int, k: int, depth: int = 0) -> RecNode:
+    Versión vectorizada de es_caso_base sobre arreglos de (n, k).
     """
-    Construye el árbol de llamadas recursivas para S(n,k).
-
-    Cada llamada S(n,k) es un nodo:
-      - Si (n,k) es caso base, se crea un nodo sin hijos.
-      - Si no, se crean recursivamente los hijos:
-            left  = S(n-1, k)
-            right = S(n-1, k-1)
-    """
-    node = RecNode(n=n, k=k, depth=depth)
-
-    # Casos base: detenemos la recursión
-    if es_caso_base(n, k):
-        return node
-
-    # Paso recursivo: S(n,k) -> S(n-1,k) y S(n-1,k-1)
-    node.left = _build_call_tree(n - 1, k, depth + 1)
-    node.right = _build_call_tree(n - 1, k - 1, depth + 1)
-    return node
+    return (ks <= 0) | (ks >= ns)
 
 
 # ---------------------------------------------------
-# Asignación de posiciones (x,y) para dibujar el árbol
+# Árbol de llamadas en arreglos paralelos
 # ---------------------------------------------------
-def _assign_positions(root: RecNode, y_step: float = -1.2) -> None:
+@dataclass(frozen=True)
+class ArbolPlano:
     """
-    Asigna posiciones (x, y) a cada nodo del árbol.
+    Árbol de llamadas de S(n,k) ya preparado, en forma de arreglos
+    paralelos (struct-of-arrays) indexados por el índice en preorden.
 
-    Estrategia:
-      - Se hace un recorrido en orden (inorder) para repartir
-        los nodos en el eje horizontal (x).
-      - La coordenada y depende de la profundidad (depth * y_step).
+    Atributos:
+        ns, ks  : parámetros (n, k) de cada llamada.
+        xs, ys  : posición de dibujo de cada nodo.
+        padre   : índice del padre (-1 para la raíz).
+        lado    : 0 si el nodo es hijo izquierdo, 1 si es derecho
+                  (-1 para la raíz).
+        izq, der: índice del hijo izquierdo / derecho (-1 si no tiene).
+        es_base : True si (n, k) es caso base.
+
+    El nodo i > 0 es el destino de la arista i - 1 (orden de aparición
+    en la animación).
     """
-    current_x = [0]  # usamos lista mutable para que el closure pueda modificarla
+    ns: np.ndarray
+    ks: np.ndarray
+    xs: np.ndarray
+    ys: np.ndarray
+    padre: np.ndarray
+    lado: np.ndarray
+    izq: np.ndarray
+    der: np.ndarray
+    es_base: np.ndarray
 
-    def inorder(node: Optional[RecNode], depth: int = 0):
-        if node is None:
-            return
+    def __len__(self) -> int:
+        return len(self.ns)
 
-        inorder(node.left, depth + 1)
-        node.x = current_x[0]
-        node.y = depth * y_step
-        current_x[0] += 1
-        inorder(node.right, depth + 1)
-
-    inorder(root, 0)
 
+def _tabla_tamanos(max_n: int) -> np.ndarray:
+    """
+    Tabla T[i, j] = número de nodos del árbol de llamadas de S(i, j),
+    para 0 <= j <= i <= max_n:
 
-def _enumerate_nodes(root: RecNode) -> int:
+        T(i,j) = 1                             si (i, j) es caso base
+        T(i,j) = 1 + T(i-1,j) + T(i-1,j-1)     en otro caso
     """
-    Asigna índices 0, 1, 2, ... a los nodos en preorden.
+    T = np.ones((max_n + 1, max_n + 1), dtype=np.int64)
+    for i in range(2, max_n + 1):
+        # Casos base de la fila: j = 0 y j = i (ya valen 1)
+        T[i, 1:i] = 1 + T[i - 1, 1:i] + T[i - 1, 0:i - 1]
+    return T
 
-    Estos índices se usan para:
-      - Controlar hasta qué nodo se dibuja en la animación.
-      - Asegurar un orden consistente de aparición.
 
-    Devuelve:
-        El número total de nodos del árbol.
+def _build_flat_tree(n: int, k: int, y_step: float = -1.2) -> ArbolPlano:
     """
-    counter = [0]
-
-    def dfs(node: Optional[RecNode]):
-        if node is None:
-            return
-        node.idx = counter[0]
-        counter[0] += 1
-        dfs(node.left)
-        dfs(node.right)
+    Construye el árbol de llamadas de S(n,k) directamente como ArbolPlano,
+    sin crear un objeto por nodo.
 
-    dfs(root)
-    return counter[0]
+    Cada llamada S(n,k) es un nodo:
+      - Si (n,k) es caso base, no tiene hijos.
+      - Si no, sus hijos son
+            izquierdo = S(n-1, k)
+            derecho   = S(n-1, k-1)
+
+    Un solo recorrido en preorden, con una pila explícita, asigna los
+    índices (orden de aparición en la animación) y las posiciones:
+      - y = profundidad * y_step.
+      - x = posición del nodo en el recorrido en orden (inorder). Se
+        calcula sin hacer ese recorrido: un nodo va después de todo su
+        subárbol izquierdo, cuyo tamaño se lee de _tabla_tamanos, y el
+        subárbol derecho empieza justo después del nodo.
+    """
+    tamanos = _tabla_tamanos(n)
+
+    ns: List[int] = []
+    ks: List[int] = []
+    xs: List[int] = []
+    profundidades: List[int] = []
+    padres: List[int] = []
+    lados: List[int] = []
+
+    # (n, k, padre, lado, profundidad, primera x libre de su subárbol)
+    pila = [(n, k, -1, -1, 0, 0)]
+    while pila:
+        ni, ki, padre, lado, profundidad, inicio = pila.pop()
+        idx = len(ns)
+        ns.append(ni)
+        ks.append(ki)
+        padres.append(padre)
+        lados.append(lado)
+        profundidades.append(profundidad)
+
+        if es_caso_base(ni, ki):
+            xs.append(inicio)
+            continue
+
+        x = inicio + int(tamanos[ni - 1, ki])
+        xs.append(x)
+        # Se apila primero el derecho para visitar antes el izquierdo
+        pila.append((ni - 1, ki - 1, idx, 1, profundidad + 1, x + 1))
+        pila.append((ni - 1, ki, idx, 0, profundidad + 1, inicio))
+
+    total = len(ns)
+    padre = np.array(padres, dtype=np.int32)
+    lado = np.array(lados, dtype=np.int8)
+    izq = np.full(total, -1, dtype=np.int32)
+    der = np.full(total, -1, dtype=np.int32)
+    hijos = np.arange(1, total, dtype=np.int32)
+    izq[padre[1:][lado[1:] == 0]] = hijos[lado[1:] == 0]
+    der[padre[1:][lado[1:] == 1]] = hijos[lado[1:] == 1]
+
+    ns_arr = np.array(ns, dtype=np.int16)
+    ks_arr = np.array(ks, dtype=np.int16)
+    return ArbolPlano(
+        ns=ns_arr,
+        ks=ks_arr,
+        xs=np.array(xs, dtype=float),
+        ys=np.array(profundidades, dtype=float) * y_step,
+        padre=padre,
+        lado=lado,
+        izq=izq,
+        der=der,
+        es_base=_es_caso_base_array(ns_arr, ks_arr),
+    )
 
 
-def _find_node_by_idx(root: RecNode, idx: int) -> Optional[RecNode]:
-    """
-    Busca en el árbol el nodo cuyo índice (idx) coincide con el valor dado.
+@lru_cache(maxsize=32)
+def _get_prepared_tree(n: int, k: int) -> ArbolPlano:
     """
-    result = None
-
-    def dfs(node: Optional[RecNode]):
-        nonlocal result
-        if node is None or result is not None:
-            return
-        if node.idx == idx:
-            result = node
-            return
-        dfs(node.left)
-        dfs(node.right)
+    Devuelve el árbol de S(n,k) con posiciones e índices en preorden ya
+    asignados, como arreglos paralelos (ver ArbolPlano).
 
-    dfs(root)
-    return result
+    El árbol solo depende de (n, k): se construye una vez con
+    _build_flat_tree y queda en una caché LRU acotada, de modo que
+    build_recurrence_trace y get_node_info lo comparten. Los arreglos no
+    deben modificarse.
+    """
+    return _build_flat_tree(n, k, y_step=-1.3)
 
 
 def get_node_info(n: int, k: int, step: int) -> Dict:
     """
-    Reconstruye el árbol de llamadas de S(n,k), lo enumera
-    y devuelve información sobre el nodo con índice = step.
+    Obtiene el árbol de llamadas de S(n,k) (ya enumerado, ver
+    _get_prepared_tree) y devuelve información sobre el nodo con
+    índice = step.
 
     Actualmente esta función no se está usando en la app,
     pero se deja para futuras extensiones (por ejemplo,
@@ -213,245 +257,397 @@ def get_node_info(n: int, k: int, step: int) -> Dict:
         "total_nodes": 0,
     }
 
-    # Validación básica similar a la de dibujar_arbol_recurrencia
-    if n < 0 or k < 0 or k > n:
+    # Validación básica similar a la de dibujar_arbol_recurrencia (el
+    # árbol crece como 2^n: no se construye si pasa de MAX_NODOS_ARBOL)
+    if n < 0 or k < 0 or k > n or contar_nodos_arbol(n, k) > MAX_NODOS_ARBOL:
         return info
 
-    root = _build_call_tree(n, k, depth=0)
-    _assign_positions(root, y_step=-1.3)
-    total_nodes = _enumerate_nodes(root)
+    arbol = _get_prepared_tree(n, k)
+    total_nodes = len(arbol)
     info["total_nodes"] = total_nodes
 
     if total_nodes == 0:
         return info
 
-    # Asegurar que step esté en rango
+    # Asegurar que step esté en rango (los nodos están indexados por idx)
     step = max(0, min(step, total_nodes - 1))
-    node = _find_node_by_idx(root, step)
-    if node is None:
-        return info
+
+    def _datos(i: int) -> Dict:
+        ni, ki = int(arbol.ns[i]), int(arbol.ks[i])
+        return {"n": ni, "k": ki, "val": stirling_s2(ni, ki)}
 
     # Nodo activo
-    n0, k0 = node.n, node.k
-    v0 = stirling_s2(n0, k0)
-    base = es_caso_base(n0, k0)
-    info["n"] = n0
-    info["k"] = k0
-    info["val"] = v0
-    info["is_base"] = base
-
-    # Hijo izquierdo
-    if node.left is not None:
-        nl, kl = node.left.n, node.left.k
-        vl = stirling_s2(nl, kl)
-        info["left"] = {"n": nl, "k": kl, "val": vl}
-
-    # Hijo derecho
-    if node.right is not None:
-        nr, kr = node.right.n, node.right.k
-        vr = stirling_s2(nr, kr)
-        info["right"] = {"n": nr, "k": kr, "val": vr}
+    info.update(_datos(step))
+    info["is_base"] = bool(arbol.es_base[step])
+
+    # Hijos izquierdo y derecho
+    if arbol.izq[step] >= 0:
+        info["left"] = _datos(arbol.izq[step])
+    if arbol.der[step] >= 0:
+        info["right"] = _datos(arbol.der[step])
 
     return info
 
 
+# ---------------------------------------------------
+# Traza plana del árbol (independiente del paso de animación)
+# ---------------------------------------------------
+def build_recurrence_trace(n: int, k: int):
+    """
+    Construye el árbol de llamadas de S(n,k) y lo aplana en tres listas
+    indexadas por el índice en preorden de cada nodo:
+
+        nodes     : [(n_i, k_i), ...]            parámetros de cada llamada.
+        edges     : [(padre, hijo, lado), ...]   lado es "left" o "right".
+        positions : [(x_i, y_i), ...]            posición de dibujo.
+
+    La traza solo depende de (n, k), no del paso de animación, así que
+    puede construirse una vez y reutilizarse con render_upto para
+    cualquier valor de step. Para parámetros inválidos devuelve listas
+    vacías.
+    """
+    nodes: List[Tuple[int, int]] = []
+    edges: List[Tuple[int, int, str]] = []
+    positions: List[Tuple[float, float]] = []
+
+    if n < 0 or k < 0 or k > n:
+        return nodes, edges, positions
+
+    arbol = _get_prepared_tree(n, k)
+
+    # Cada arista se guarda en la posición de su hijo, para que la arista j
+    # llegue al nodo j + 1 (mismo orden en que aparecen en la animación).
+    nodes.extend(zip(arbol.ns.tolist(), arbol.ks.tolist()))
+    positions.extend(zip(arbol.xs.tolist(), arbol.ys.tolist()))
+    edges.extend(zip(
+        arbol.padre[1:].tolist(),
+        range(1, len(arbol)),
+        np.where(arbol.lado[1:] == 0, "left", "right").tolist(),
+    ))
+    return nodes, edges, positions
+
+
+def build_recurrence_dag(n: int, k: int, y_step: float = -1.3):
+    """
+    Versión compacta de build_recurrence_trace: un solo nodo por cada
+    llamada distinta S(n', k') en lugar de uno por cada vez que se llama.
+
+    El árbol completo tiene del orden de 2^(n-1) nodos, pero solo hay
+    O(n·k) pares (n', k') distintos: las llamadas repetidas se funden en
+    un mismo nodo y sus aristas de entrada se conservan, de modo que el
+    resultado es un grafo dirigido acíclico (DAG) que se puede dibujar
+    para cualquier n.
+
+    Devuelve las mismas tres listas que build_recurrence_trace (nodos en
+    orden por niveles, de arriba abajo). La disposición es por capas:
+        y = profundidad · y_step, con profundidad = n - n'
+        x = (k - k') - profundidad / 2
+    así el hijo izquierdo S(n'-1,k') queda media unidad a la izquierda de
+    su padre y el derecho S(n'-1,k'-1) media unidad a la derecha.
+
+    En un DAG un nodo puede tener dos aristas de entrada, así que aquí no
+    se cumple que la arista j llegue al nodo j + 1: la traza está pensada
+    para dibujarse completa (step=None).
+    """
+    nodes: List[Tuple[int, int]] = []
+    edges: List[Tuple[int, int, str]] = []
+    positions: List[Tuple[float, float]] = []
+
+    if n < 0 or k < 0 or k > n:
+        return nodes, edges, positions
+
+    indice: Dict[Tuple[int, int], int] = {(n, k): 0}
+    nodes.append((n, k))
+    positions.append((0.0, 0.0))
+
+    # Recorrido por niveles: los nodos de profundidad d se visitan todos
+    # antes que los de profundidad d + 1, y cada par se añade una sola vez
+    i = 0
+    while i < len(nodes):
+        ni, ki = nodes[i]
+        if not es_caso_base(ni, ki):
+            for hijo, lado in (((ni - 1, ki), "left"), ((ni - 1, ki - 1), "right")):
+                if hijo not in indice:
+                    indice[hijo] = len(nodes)
+                    nodes.append(hijo)
+                    profundidad = n - hijo[0]
+                    positions.append((
+                        (k - hijo[1]) - profundidad / 2,
+                        profundidad * y_step,
+                    ))
+                edges.append((i, indice[hijo], lado))
+        i += 1
+
+    return nodes, edges, positions
+
+
+def multiplicidades_dag(
+    nodes: List[Tuple[int, int]],
+    edges: List[Tuple[int, int, str]],
+) -> List[int]:
+    """
+    Número de veces que se llama a cada nodo de una traza compacta (ver
+    build_recurrence_dag) al evaluar la recurrencia desde la raíz, es
+    decir, cuántos nodos del árbol completo se funden en él.
+
+    La raíz se llama una vez y cada arista padre → hijo aporta al hijo
+    todas las llamadas del padre. Las aristas salen de los padres en
+    orden por niveles, así que al propagar las de un padre este ya tiene
+    su total definitivo.
+    """
+    mult = [0] * len(nodes)
+    if nodes:
+        mult[0] = 1
+    for padre, hijo, _ in edges:
+        mult[hijo] += mult[padre]
+    return mult
+
+
+def contar_nodos_arbol(n: int, k: int) -> int:
+    """
+    Número de nodos del árbol de llamadas completo de S(n,k), sin
+    construirlo: la suma de las multiplicidades de su DAG de llamadas
+    distintas (ver multiplicidades_dag).
+    """
+    return sum(multiplicidades_dag(*build_recurrence_dag(n, k)[:2]))
+
+
+# Máximo de nodos del árbol completo que se dibuja y anima en la app: el
+# del mayor árbol con n = MAX_N_ARBOL. Por encima se usa el DAG.
+MAX_NODOS_ARBOL = max(contar_nodos_arbol(MAX_N_ARBOL, k) for k in range(MAX_N_ARBOL + 1))
+
+
 # ---------------------------------------------------
 # Dibujo del árbol
 # ---------------------------------------------------
-def _draw_edges(ax, node: Optional[RecNode], max_step: Optional[int]):
+def _nueva_figura():
+    """
+    Crea la figura (fondo negro) sobre la que se dibuja el árbol.
+
+    Es una Figure fuera de pyplot con su propio canvas Agg: no queda
+    registrada en el estado global de pyplot (compartido entre las
+    sesiones de Streamlit) y no hace falta plt.close para liberarla.
+    Crear una nueva es más barato que limpiar una existente con ax.clear().
+    """
+    fig = Figure(figsize=(6.5, 4.5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_facecolor("black")
+    fig.patch.set_facecolor("black")
+    return fig, ax
+
+
+def _figura_mensaje(texto: str, fontsize: int):
+    """
+    Figura con un único mensaje centrado (parámetros inválidos, etc.).
+    """
+    fig, ax = _nueva_figura()
+    ax.text(
+        0.5,
+        0.5,
+        texto,
+        ha="center",
+        va="center",
+        color="white",
+        fontsize=fontsize,
+    )
+    ax.axis("off")
+    fig.tight_layout()
+    return fig
+
+
+def _etiqueta_nodo(n: int, k: int, multiplicidad: int = 1) -> str:
+    """
+    Texto que acompaña al nodo S(n,k): los casos base muestran su valor,
+    los nodos internos NO muestran el resultado. En la vista compacta,
+    un nodo que reúne varias llamadas lo indica con "×multiplicidad".
+    """
+    if es_caso_base(n, k):
+        texto = f"S({n},{k}) = {stirling_s2(n, k)}"
+    else:
+        texto = f"S({n},{k})"
+    if multiplicidad > 1:
+        texto += f" ×{multiplicidad}"
+    return texto
+
+
+def _draw_edges(
+    ax,
+    edges: List[Tuple[int, int, str]],
+    positions: List[Tuple[float, float]],
+    max_step: Optional[int],
+):
     """
-    Dibuja las aristas (flechas) del árbol.
+    Dibuja las aristas (flechas) del árbol como una sola LineCollection.
 
     Convención visual:
       - Flecha izquierda  (hijo = node.left)  en morado oscuro (#8a2be2)
       - Flecha derecha    (hijo = node.right) en amarillo (#ffd700)
 
     max_step controla la animación: solo se dibujan aristas
-    cuyos nodos origen y destino tienen idx <= max_step.
+    cuyos nodos origen y destino tienen idx <= max_step. Como las aristas
+    están en preorden (la arista j llega al nodo j + 1), son las primeras
+    max_step.
+
+    Cada flecha es una polilínea (tallo + punta abierta, como "->" de
+    annotate) calculada en píxeles con los mismos recortes de 10 pt en los
+    extremos, por lo que debe llamarse con los límites y el layout de la
+    figura ya fijados.
     """
-    if node is None:
+    visibles = edges if max_step is None else edges[:max_step]
+    if not visibles:
         return
 
-    children = [("left", node.left), ("right", node.right)]
-
-    for side, child in children:
-        if child is not None:
-
-            # Solo dibujar si ambos nodos están dentro del paso de animación
-            if max_step is None or (node.idx <= max_step and child.idx <= max_step):
-
-                # Colores según convención
-                if side == "left":
-                    arrow_color = "#8a2be2"   # morado oscuro → k·S(n-1,k)
-                else:
-                    arrow_color = "#ffd700"   # amarillo → S(n-1,k-1)
-
-                ax.annotate(
-                    "",
-                    xy=(child.x, child.y),
-                    xytext=(node.x, node.y),
-                    arrowprops=dict(
-                        arrowstyle="->",
-                        color=arrow_color,
-                        lw=1.2,
-                        alpha=0.9,
-                        shrinkA=10,
-                        shrinkB=10,
-                    ),
-                    zorder=1,
-                )
+    origen = np.array([positions[padre] for padre, _, _ in visibles], dtype=float)
+    destino = np.array([positions[hijo] for _, hijo, _ in visibles], dtype=float)
+    colores = [
+        "#8a2be2" if lado == "left" else "#ffd700"   # k·S(n-1,k) / S(n-1,k-1)
+        for _, _, lado in visibles
+    ]
 
-            _draw_edges(ax, child, max_step)
+    # Geometría en píxeles: recortes y punta se miden en puntos tipográficos
+    a_pixeles = ax.transData
+    pt = ax.figure.dpi / 72.0
+    p0 = a_pixeles.transform(origen)
+    p1 = a_pixeles.transform(destino)
+    d = p1 - p0
+    largo = np.hypot(d[:, 0], d[:, 1])[:, None]
+    u = d / np.where(largo == 0, 1.0, largo)
+    normal = np.column_stack((-u[:, 1], u[:, 0]))
+
+    recorte = 10 * pt                         # shrinkA = shrinkB = 10
+    largo_punta, ancho_punta = 4 * pt, 2 * pt  # "->" con mutation_scale 10
+    inicio = p0 + u * recorte
+    punta = p1 - u * recorte
+    base_punta = punta - u * largo_punta
+
+    # inicio → punta → barba 1 → punta → barba 2
+    polilineas = np.stack(
+        (
+            inicio,
+            punta,
+            base_punta + normal * ancho_punta,
+            punta,
+            base_punta - normal * ancho_punta,
+        ),
+        axis=1,
+    )
+    segmentos = a_pixeles.inverted().transform(
+        polilineas.reshape(-1, 2)
+    ).reshape(polilineas.shape)
+
+    ax.add_collection(
+        LineCollection(
+            segmentos,
+            colors=colores,
+            linewidths=1.2,
+            alpha=0.9,
+            zorder=1,
+            gid="arbol-aristas",
+        ),
+        autolim=False,
+    )
 
 
-def _draw_nodes(ax, node: Optional[RecNode], max_step: Optional[int]):
+def _draw_nodes(
+    ax,
+    nodes: List[Tuple[int, int]],
+    positions: List[Tuple[float, float]],
+    max_step: Optional[int],
+    multiplicidades: Optional[List[int]] = None,
+):
     """
-    Dibuja los nodos del árbol (círculos y etiquetas).
+    Dibuja los nodos del árbol: un único scatter para los círculos y una
+    etiqueta de texto por nodo (con su multiplicidad, si se da; ver
+    multiplicidades_dag).
 
     Convención:
       - Nodos caso base: color naranja, etiqueta S(n,k) = valor.
       - Nodos internos: color azul, etiqueta S(n,k) (sin mostrar el valor).
+
+    Como los nodos están en preorden, la animación se reduce a dibujar
+    los primeros max_step + 1.
     """
-    if node is None:
+    visibles = nodes if max_step is None else nodes[: max_step + 1]
+    if not visibles:
         return
 
-    # Respetar la animación: solo dibujar nodos hasta max_step
-    if max_step is None or node.idx <= max_step:
-        val = stirling_s2(node.n, node.k)
-        base = es_caso_base(node.n, node.k)
-
-        # Etiqueta diferenciada:
-        if base:
-            # Los casos base sí muestran su valor
-            label = f"S({node.n},{node.k}) = {val}"
-        else:
-            # Los nodos internos NO muestran el resultado
-            label = f"S({node.n},{node.k})"
-
-        # Colores según tipo de nodo
-        if base:
-            # Caso base: naranja
-            color_nodo = "#ff7f0e"
-        else:
-            # Nodo recursivo normal: azul
-            color_nodo = "#1f77b4"
-
-        # ----- Nodo (círculo) -----
-        ax.scatter(
-            [node.x],
-            [node.y],
-            s=200,
-            color=color_nodo,
-            edgecolors="white",
-            linewidths=1.2,
-            zorder=2,
-        )
+    pos = np.asarray(positions[: len(visibles)], dtype=float)
+    nk = np.asarray(visibles)
+    bases = _es_caso_base_array(nk[:, 0], nk[:, 1])
+
+    # ----- Nodos (círculos) -----
+    # Caso base: naranja; nodo recursivo normal: azul
+    ax.scatter(
+        pos[:, 0],
+        pos[:, 1],
+        s=200,
+        c=np.where(bases, "#ff7f0e", "#1f77b4"),
+        edgecolors="white",
+        linewidths=1.2,
+        zorder=2,
+        gid="arbol-nodos",
+    )
 
-        # ----- Etiqueta (debajo del nodo) -----
+    # ----- Etiquetas (debajo de cada nodo) -----
+    mult = multiplicidades or [1] * len(visibles)
+    for idx, ((n, k), (x, y)) in enumerate(zip(visibles, pos.tolist())):
         ax.text(
-            node.x,
-            node.y - 0.25,      # un poco debajo para no tapar el nodo
-            label,
+            x,
+            y - 0.25,           # un poco debajo para no tapar el nodo
+            _etiqueta_nodo(n, k, mult[idx]),
             ha="center",
             va="top",
             color="lime",       # verde tipo "terminal"
             fontsize=7,
             fontweight="bold",
             zorder=3,
+            gid=f"paso-{idx}-etiqueta",
         )
 
-    # Recorrer hijos
-    _draw_nodes(ax, node.left, max_step)
-    _draw_nodes(ax, node.right, max_step)
 
-
-# ---------------------------------------------------
-# Función pública llamada desde app.py
-# ---------------------------------------------------
-def dibujar_arbol_recurrencia(n: int, k: int, step: Optional[int] = None):
+def render_upto(
+    nodes: List[Tuple[int, int]],
+    edges: List[Tuple[int, int, str]],
+    positions: List[Tuple[float, float]],
+    step: Optional[int] = None,
+    titulo: Optional[str] = None,
+    multiplicidades: Optional[List[int]] = None,
+):
     """
-    Dibuja el árbol de recurrencia para S(n,k) y devuelve:
-
-        fig, total_nodes
+    Dibuja una traza (ver build_recurrence_trace) hasta el nodo con
+    índice = step y devuelve la figura de matplotlib.
 
-    donde:
-      - fig         : figura de matplotlib para mostrar en Streamlit.
-      - total_nodes : número total de nodos del árbol.
-
-    Parámetros:
-        n, k : definen la llamada S(n,k) en la raíz.
-        step : índice máximo de nodo a dibujar (para animación). Si es None,
-               se dibuja el árbol completo.
-
-    Nota:
-        Para evitar árboles gigantes en pantalla, se limita a n <= 8.
+    Si step es None se dibuja el árbol completo. El coste de dibujo es
+    proporcional a step, no al tamaño del árbol. titulo y
+    multiplicidades son para la traza compacta de build_recurrence_dag
+    (ver dibujar_arbol_recurrencia).
     """
-    fig, ax = plt.subplots(figsize=(6.5, 4.5))
-    ax.set_facecolor("black")
-    fig.patch.set_facecolor("black")
+    fig, ax = _nueva_figura()
 
-    # Validación básica
-    if n < 0 or k < 0 or k > n:
-        ax.text(
-            0.5,
-            0.5,
-            f"Parámetros inválidos:\nS({n},{k})",
-            ha="center",
-            va="center",
-            color="white",
-            fontsize=14,
-        )
+    if not nodes:
         ax.axis("off")
-        plt.tight_layout()
+        fig.tight_layout()
         return fig
 
-    if n > 8:
-        ax.text(
-            0.5,
-            0.5,
-            f"n = {n} es demasiado grande\npara dibujar el árbol de recurrencia.\nUsa n ≤ 8.",
-            ha="center",
-            va="center",
-            color="white",
-            fontsize=12,
-        )
-        ax.axis("off")
-        plt.tight_layout()
-        return fig
-
-    # Construir árbol de llamadas y preparar posiciones/índices
-    root = _build_call_tree(n, k, depth=0)
-    _assign_positions(root, y_step=-1.3)
-    total_nodes = _enumerate_nodes(root)
-
     # Recortar step si está fuera de rango
     if step is not None:
-        step = max(0, min(step, total_nodes - 1))
+        step = max(0, min(step, len(nodes) - 1))
 
-    _draw_edges(ax, root, max_step=step)
-    _draw_nodes(ax, root, max_step=step)
+    _draw_nodes(ax, nodes, positions, max_step=step, multiplicidades=multiplicidades)
 
     # Ajustar márgenes para que el árbol entre bien
-    xs: list[float] = []
-    ys: list[float] = []
-
-    def collect(node: Optional[RecNode]):
-        if node is None:
-            return
-        xs.append(node.x)
-        ys.append(node.y)
-        collect(node.left)
-        collect(node.right)
-
-    collect(root)
-
-    if xs and ys:
-        margen_x = 1.0
-        margen_y = 0.8
-        ax.set_xlim(min(xs) - margen_x, max(xs) + margen_x)
-        ax.set_ylim(min(ys) - margen_y, max(ys) + margen_y)
-
-    ax.set_title(f"Árbol de recurrencia para S({n},{k})", color="white", fontsize=12)
+    minimos = np.min(positions, axis=0)
+    maximos = np.max(positions, axis=0)
+    margen_x = 1.0
+    margen_y = 0.8
+    ax.set_xlim(minimos[0] - margen_x, maximos[0] + margen_x)
+    ax.set_ylim(minimos[1] - margen_y, maximos[1] + margen_y)
+
+    if titulo is None:
+        n, k = nodes[0]
+        titulo = f"Árbol de recurrencia para S({n},{k})"
+    ax.set_title(titulo, color="white", fontsize=12)
 
     # Leyenda con la convención de colores de las flechas
     legend_elements = [
@@ -476,6 +672,95 @@ def dibujar_arbol_recurrencia(n: int, k: int, step: Optional[int] = None):
         fontsize=8,
     )
 
-    plt.tight_layout()
+    fig.tight_layout()
+
+    # Las flechas se calculan en píxeles: con límites y layout ya fijados
+    _draw_edges(ax, edges, positions, max_step=step)
+
+    return fig
+
+
+def render_svg(
+    nodes: List[Tuple[int, int]],
+    edges: List[Tuple[int, int, str]],
+    positions: List[Tuple[float, float]],
+    titulo: Optional[str] = None,
+    multiplicidades: Optional[List[int]] = None,
+) -> str:
+    """
+    Dibuja la traza completa y la devuelve como documento SVG (texto);
+    titulo y multiplicidades como en render_upto.
+
+    Los círculos quedan en el grupo <g id="arbol-nodos"> y las flechas en
+    <g id="arbol-aristas">, un elemento hijo por nodo / arista y en
+    preorden; cada etiqueta está en su propio grupo <g id="paso-i-etiqueta">.
+    Así el navegador puede reproducir la animación mostrando solo los
+    elementos hasta el paso deseado, sin volver a dibujar nada en Python.
+    """
+    fig = render_upto(
+        nodes, edges, positions, titulo=titulo, multiplicidades=multiplicidades
+    )
+    buffer = io.StringIO()
+    # Texto como <text> (no como trazos): SVG mucho más ligero
+    with plt.rc_context({"svg.fonttype": "none"}):
+        fig.savefig(buffer, format="svg", facecolor=fig.get_facecolor())
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------
+# Función pública llamada desde app.py
+# ---------------------------------------------------
+def dibujar_arbol_recurrencia(
+    n: int,
+    k: int,
+    step: Optional[int] = None,
+    compartir_subarboles: bool = False,
+):
+    """
+    Dibuja el árbol de recurrencia para S(n,k) y devuelve:
+
+        fig, total_nodes
+
+    donde:
+      - fig         : figura de matplotlib para mostrar en Streamlit.
+      - total_nodes : número total de nodos del árbol (0 si no se dibuja).
+
+    Parámetros:
+        n, k : definen la llamada S(n,k) en la raíz.
+        step : índice máximo de nodo a dibujar (para animación). Si es None,
+               se dibuja el árbol completo.
+        compartir_subarboles: si es True se dibuja la vista compacta (ver
+               build_recurrence_dag): cada llamada distinta una sola vez,
+               con su multiplicidad, completa (step se ignora) y sin límite
+               de n. total_nodes es entonces el número de nodos distintos.
+
+    Nota:
+        Para evitar árboles gigantes en pantalla, el árbol completo se
+        limita a MAX_NODOS_ARBOL nodos (contados con contar_nodos_arbol,
+        sin construirlo).
+        Si se van a dibujar varios pasos del mismo (n, k), conviene construir
+        la traza una vez con build_recurrence_trace y llamar a render_upto.
+    """
+    # Validación básica
+    if n < 0 or k < 0 or k > n:
+        return _figura_mensaje(f"Parámetros inválidos:\nS({n},{k})", fontsize=14), 0
+
+    if compartir_subarboles:
+        nodes, edges, positions = build_recurrence_dag(n, k)
+        fig = render_upto(
+            nodes, edges, positions,
+            titulo=f"Llamadas distintas de S({n},{k})",
+            multiplicidades=multiplicidades_dag(nodes, edges),
+        )
+        return fig, len(nodes)
+
+    total_arbol = contar_nodos_arbol(n, k)
+    if total_arbol > MAX_NODOS_ARBOL:
+        return _figura_mensaje(
+            f"S({n},{k}) tiene {total_arbol} nodos: demasiados\npara dibujar el árbol de recurrencia.\n"
+            f"Usa la vista compacta o un árbol de ≤ {MAX_NODOS_ARBOL} nodos.",
+            fontsize=12,
+        ), 0
 
-    return fig, total_nodes
+    nodes, edges, positions = build_recurrence_trace(n, k)
+    return render_upto(nodes, edges, positions, step=step), len(nodes)
@@ -40,7 +40,9 @@
 # -------------------------------------------------------------
 
 from __future__ import annotations
-from typing import Dict, Iterator, List
+from typing import Iterator, List, Tuple
+
+import numpy as np
 
 
 # -------------------------------------------------------------
@@ -57,18 +59,59 @@ def rgs_to_blocks(a: List[int]) -> List[List[int]]:
         Lista de bloques, donde cada bloque es una lista de enteros 1-based.
         El orden de los bloques sigue el orden de aparición de las etiquetas
         (0, luego 1, luego 2, ...).
+
+    En una RGS las etiquetas usadas son exactamente 0..max(a), así que
+    la etiqueta es directamente el índice del bloque (sin diccionario ni
+    ordenación), y una etiqueta nueva siempre es la siguiente libre: su
+    primera aparición abre el bloque en una sola pasada.
     """
-    groups: Dict[int, List[int]] = {}
+    blocks: List[List[int]] = []
     for i, label in enumerate(a, start=1):  # i es el elemento 1..n
-        groups.setdefault(label, []).append(i)
+        if label == len(blocks):
+            blocks.append([i])
+        else:
+            blocks[label].append(i)
+    return blocks
+
+
+def _emitir(a: List[int], yield_blocks: bool, copy: bool) -> List[int] | List[List[int]]:
+    """
+    Valor que emiten los generadores rgs_* para el estado actual a.
 
-    # Orden natural por etiqueta RGS (0,1,2,...) respeta el orden de creación
-    return [groups[k] for k in sorted(groups.keys())]
+    Con yield_blocks se devuelven los bloques (siempre listas nuevas).
+    Si no, la RGS: una copia si copy es True, o la propia lista de estado
+    del generador si copy es False. En ese caso no hay que modificarla y
+    solo es válida hasta pedir el siguiente elemento (se sobrescribe en
+    su sitio); sirve para recorridos que leen cada RGS y la descartan.
+    """
+    if yield_blocks:
+        return rgs_to_blocks(a)
+    return list(a) if copy else a
 
 
 # -------------------------------------------------------------
 # Algoritmo V — Todas las particiones (sin restricción de k)
 # -------------------------------------------------------------
+def _rellenar(a: List[int], b: List[int], c: int, n: int) -> None:
+    """
+    Paso común de los Algoritmos V, X e Y tras incrementar a[c]: deja
+    las posiciones c+1..n-1 en su mínimo válido, es decir
+
+        for i in range(c + 1, n):
+            a[i] = 0
+            b[i] = max(a[i - 1], b[i - 1])
+
+    Como a[c+1..] queda en 0, todos esos b[i] valen max(a[c], b[c]):
+    se calcula una vez (sin llamar a max) y se asignan los tramos
+    completos de una sola vez.
+    """
+    resto = n - c - 1
+    if resto > 0:
+        m = a[c] if a[c] > b[c] else b[c]
+        a[c + 1:] = [0] * resto
+        b[c + 1:] = [m] * resto
+
+
 def _next_V(a: List[int], b: List[int], n: int) -> bool:
     """
     Algoritmo V (rutina interna): avanza a la siguiente RGS en orden
@@ -98,14 +141,12 @@ def _next_V(a: List[int], b: List[int], n: int) -> bool:
     # Incrementamos la posición c
     a[c] += 1
     # Rellenamos las posiciones siguientes con el mínimo válido
-    for i in range(c + 1, n):
-        a[i] = 0
-        b[i] = max(a[i - 1], b[i - 1])
+    _rellenar(a, b, c, n)
     return True
 
 
 def rgs_all(
-    n: int, *, yield_blocks: bool = False
+    n: int, *, yield_blocks: bool = False, copy: bool = True
 ) -> Iterator[List[int] | List[List[int]]]:
     """
     Genera TODAS las RGS de longitud n (particiones de {1..n})
@@ -116,6 +157,7 @@ def rgs_all(
         yield_blocks: si es True, se devuelven particiones como lista
                       de bloques (1-based). Si es False, se devuelve
                       la RGS cruda (lista de enteros).
+        copy        : ver _emitir (solo afecta a las RGS crudas).
 
     Ejemplo de uso:
         for p in rgs_all(3, yield_blocks=True):
@@ -133,11 +175,11 @@ def rgs_all(
     b = [0] * n
 
     # Emitir estado inicial
-    yield rgs_to_blocks(a) if yield_blocks else list(a)
+    yield _emitir(a, yield_blocks, copy)
 
     # Iterar hasta agotar
     while _next_V(a, b, n):
-        yield rgs_to_blocks(a) if yield_blocks else list(a)
+        yield _emitir(a, yield_blocks, copy)
 
 
 # -------------------------------------------------------------
@@ -173,25 +215,38 @@ def _next_X(a: List[int], b: List[int], n: int, k: int) -> bool:
     Devuelve:
         True  si existe una siguiente RGS con k bloques.
         False si ya no hay más.
+
+    El original repite el avance (bucle de reintentos) hasta dar con una
+    RGS que use k etiquetas, lo que para k cercano a n descarta muchas
+    RGS por cada una válida. Aquí, si tras el avance faltan etiquetas, se
+    completa directamente la menor RGS válida con ese prefijo: la cola se
+    rellena desde el final con k-1, k-2, ... hasta enlazar con el máximo
+    del prefijo (el mismo ajuste que usa el Algoritmo Y). El resultado es
+    exactamente la RGS a la que llegarían los reintentos.
     """
-    while True:
-        c = n - 1
-        # Buscar primera posición desde la derecha que se pueda incrementar
-        while a[c] == k - 1 or a[c] > b[c]:
-            c -= 1
-            if c == 0:
-                return False
-        a[c] += 1
-        for i in range(c + 1, n):
-            a[i] = 0
-            b[i] = max(a[i - 1], b[i - 1])
-        m = max(a[n - 1], b[n - 1])
-        if m == k - 1:
-            return True
+    c = n - 1
+    # Buscar primera posición desde la derecha que se pueda incrementar
+    while a[c] == k - 1 or a[c] > b[c]:
+        c -= 1
+        if c == 0:
+            return False
+    a[c] += 1
+    _rellenar(a, b, c, n)
+
+    m = a[n - 1] if a[n - 1] > b[n - 1] else b[n - 1]
+    if m != k - 1:
+        i = n - 1
+        k0 = k - 1
+        while k0 > b[i]:
+            a[i] = k0
+            b[i] = k0 - 1
+            i -= 1
+            k0 -= 1
+    return True
 
 
 def rgs_exactly(
-    n: int, k: int, *, yield_blocks: bool = False
+    n: int, k: int, *, yield_blocks: bool = False, copy: bool = True
 ) -> Iterator[List[int] | List[List[int]]]:
     """
     Genera las RGS (particiones de {1..n}) con exactamente k bloques.
@@ -204,6 +259,7 @@ def rgs_exactly(
         n, k        : tamaño del conjunto y número de bloques.
         yield_blocks: si es True, se devuelven listas de bloques (1-based);
                       si es False, se devuelven las RGS crudas.
+        copy        : ver _emitir (solo afecta a las RGS crudas).
 
     Esta es la función que usa la app para el modo
     "Exactamente k bloques".
@@ -226,13 +282,13 @@ def rgs_exactly(
     # Caso trivial: k = 1 -> todo en un solo bloque
     if k == 1:
         a = [0] * n  # RGS: todos con etiqueta 0
-        yield rgs_to_blocks(a) if yield_blocks else list(a)
+        yield _emitir(a, yield_blocks, copy)
         return
 
     # Caso trivial: k = n -> cada elemento en su propio bloque
     if k == n:
         a = list(range(n))  # RGS: [0,1,2,...,n-1]
-        yield rgs_to_blocks(a) if yield_blocks else list(a)
+        yield _emitir(a, yield_blocks, copy)
         return
 
     # Resto de casos (2 <= k <= n-1) -> usamos Algoritmo X
@@ -241,11 +297,11 @@ def rgs_exactly(
     _first_X(a, b, n, k)
 
     # Emitir estado inicial
-    yield rgs_to_blocks(a) if yield_blocks else list(a)
+    yield _emitir(a, yield_blocks, copy)
 
     # Iterar
     while _next_X(a, b, n, k):
-        yield rgs_to_blocks(a) if yield_blocks else list(a)
+        yield _emitir(a, yield_blocks, copy)
 
 
 # -------------------------------------------------------------
@@ -263,11 +319,15 @@ def _first_Y(a: List[int], b: List[int], n: int, k: int) -> None:
             b[i] = std::max(a[i - 1], b[i - 1]);
         }
     """
-    # Asumimos que a[:] y b[:] empiezan en 0
+    # Asumimos que a[:] y b[:] empiezan en 0, así que el máximo de la
+    # posición anterior a start es 0; a partir de ahí se arrastra en m
     start = n - k
+    m = 0
     for i in range(start, n):
-        a[i] = i - n + k
-        b[i] = max(a[i - 1], b[i - 1]) if i - 1 >= 0 else 0
+        ai = i - start
+        a[i] = ai
+        b[i] = m
+        m = ai if ai > m else m
 
 
 def _next_Y(a: List[int], b: List[int], n: int, k: int) -> bool:
@@ -287,12 +347,11 @@ def _next_Y(a: List[int], b: List[int], n: int, k: int) -> bool:
         c -= 1
 
     a[c] += 1
-    for i in range(c + 1, n):
-        a[i] = 0
-        b[i] = max(a[i - 1], b[i - 1])
+    _rellenar(a, b, c, n)
 
     # Ajuste para asegurar que el máximo de la RGS sea exactamente k-1
-    if max(a[n - 1], b[n - 1]) != k - 1:
+    m = a[n - 1] if a[n - 1] > b[n - 1] else b[n - 1]
+    if m != k - 1:
         i = n - 1
         k0 = k - 1
         while k0 > b[i]:
@@ -304,7 +363,7 @@ def _next_Y(a: List[int], b: List[int], n: int, k: int) -> bool:
 
 
 def rgs_exactly_y(
-    n: int, k: int, *, yield_blocks: bool = False
+    n: int, k: int, *, yield_blocks: bool = False, copy: bool = True
 ) -> Iterator[List[int] | List[List[int]]]:
     """
     Genera las RGS (particiones de {1..n}) con exactamente k bloques
@@ -317,6 +376,7 @@ def rgs_exactly_y(
         n, k        : tamaño del conjunto y número de bloques.
         yield_blocks: si es True, devuelve bloques 1-based; si es False,
                       devuelve la RGS.
+        copy        : ver _emitir (solo afecta a las RGS crudas).
     """
     if not (0 <= k <= n):
         return
@@ -324,14 +384,17 @@ def rgs_exactly_y(
         if k == 0:
             yield [] if not yield_blocks else []
         return
+    # Con n >= 1 no hay particiones de 0 bloques (el Algoritmo Y supone k >= 1)
+    if k == 0:
+        return
 
     a = [0] * n
     b = [0] * n
     _first_Y(a, b, n, k)
 
-    yield rgs_to_blocks(a) if yield_blocks else list(a)
+    yield _emitir(a, yield_blocks, copy)
     while _next_Y(a, b, n, k):
-        yield rgs_to_blocks(a) if yield_blocks else list(a)
+        yield _emitir(a, yield_blocks, copy)
 
 
 # -------------------------------------------------------------
@@ -377,7 +440,7 @@ def _next_Z(a: List[int], b: List[int], n: int, kmin: int, kmax: int) -> bool:
         i -= 1
 
     a[i] += 1
-    b[i + 1] = max(a[i], b[i])
+    b[i + 1] = a[i] if a[i] > b[i] else b[i]
 
     zeroes = b[i + 1] + n - i - kmin
     i += 1
@@ -396,7 +459,7 @@ def _next_Z(a: List[int], b: List[int], n: int, kmin: int, kmax: int) -> bool:
 
 
 def rgs_range(
-    n: int, kmin: int, kmax: int, *, yield_blocks: bool = False
+    n: int, kmin: int, kmax: int, *, yield_blocks: bool = False, copy: bool = True
 ) -> Iterator[List[int] | List[List[int]]]:
     """
     Genera RGS (particiones de {1..n}) cuyo número de bloques
@@ -411,6 +474,7 @@ def rgs_range(
         kmin, kmax  : cota inferior y superior del número de bloques.
         yield_blocks: si es True, devuelve bloques 1-based; si es False,
                       devuelve la RGS.
+        copy        : ver _emitir (solo afecta a las RGS crudas).
     """
     if n < 0:
         raise ValueError("n debe ser >= 0")
@@ -420,6 +484,11 @@ def rgs_range(
         if kmin == 0 <= kmax:
             yield [] if not yield_blocks else []
         return
+    # Con n >= 1 no hay particiones de 0 bloques (el Algoritmo Z supone
+    # kmin >= 1; con kmin = 0 y kmax = 0 las generaría todas)
+    if kmax == 0:
+        return
+    kmin = max(kmin, 1)
 
     a = [0] * n
     # b es de longitud n+1 según el original
@@ -427,8 +496,304 @@ def rgs_range(
     _first_Z(a, b, n, kmin)
 
     # Emitir estado inicial (corresponde exactamente a kmin bloques)
-    yield rgs_to_blocks(a) if yield_blocks else list(a)
+    yield _emitir(a, yield_blocks, copy)
 
     # Iterar siguientes RGS dentro del rango [kmin, kmax]
     while _next_Z(a, b, n, kmin, kmax):
-        yield rgs_to_blocks(a) if yield_blocks else list(a)
+        yield _emitir(a, yield_blocks, copy)
+
+
+# -------------------------------------------------------------
+# Representación compacta en arreglos NumPy
+# -------------------------------------------------------------
+def _rgs_matrix(n: int, kmin: int, kmax: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Construye de una vez todas las RGS de longitud n con entre kmin y kmax
+    bloques, en orden lexicográfico, usando solo operaciones vectorizadas
+    de NumPy (sin un paso de intérprete por RGS).
+
+    Se avanza posición a posición: cada RGS parcial a[0..i-1] con máxima
+    etiqueta m se extiende con las etiquetas 0..min(m+1, kmax-1) en orden
+    creciente, lo que conserva el orden lexicográfico (el mismo que
+    producen los Algoritmos V y X). Las ramas que ya no pueden llegar a
+    kmin bloques se descartan en cuanto se detectan.
+
+    Devuelve:
+        codes : arreglo (M, n) de tipo int8; la fila i es la i-ésima RGS.
+        k_per : arreglo (M,) de tipo int8 con el número de bloques de
+                cada RGS (máxima etiqueta + 1).
+
+    Con int8 basta para n <= 127.
+    """
+    if n == 0:
+        # Solo existe la RGS vacía (partición vacía, 0 bloques)
+        m = 1 if kmin <= 0 <= kmax else 0
+        return np.zeros((m, 0), dtype=np.int8), np.zeros(m, dtype=np.int8)
+    if kmax < 1 or kmin > n or kmin > kmax:
+        return np.zeros((0, n), dtype=np.int8), np.zeros(0, dtype=np.int8)
+
+    # a[0] = 0 siempre: una sola RGS parcial con máximo 0
+    codes = np.zeros((1, n), dtype=np.int8)
+    maxes = np.zeros(1, dtype=np.intp)
+    codes, maxes = _extender(codes, maxes, 1, n, n, kmin, kmax)
+    return codes, (maxes + 1).astype(np.int8)
+
+
+def _extender(
+    codes: np.ndarray,
+    maxes: np.ndarray,
+    desde: int,
+    hasta: int,
+    n: int,
+    kmin: int,
+    kmax: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Paso de _rgs_matrix: extiende las RGS parciales codes[:, :desde]
+    (con máxima etiqueta maxes) a todas sus continuaciones válidas hasta
+    la posición hasta - 1, en orden lexicográfico.
+
+    Devuelve las filas resultantes y su máxima etiqueta.
+    """
+    for i in range(desde, hasta):
+        # Número de etiquetas posibles en la posición i para cada fila
+        choices = np.minimum(maxes + 2, kmax)
+        parent = np.repeat(np.arange(len(codes)), choices)
+        first = np.repeat(np.cumsum(choices) - choices, choices)
+        labels = np.arange(len(parent)) - first
+
+        codes = codes[parent]
+        codes[:, i] = labels
+        maxes = np.maximum(maxes[parent], labels)
+
+        # Podar las filas que ni usando etiquetas nuevas en todas las
+        # posiciones restantes alcanzarían kmin bloques
+        viable = maxes + 1 + (n - 1 - i) >= kmin
+        if not viable.all():
+            codes = codes[viable]
+            maxes = maxes[viable]
+
+    return codes, maxes
+
+
+def rgs_all_array(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Versión de rgs_all que devuelve todas las RGS de {1..n} como arreglos.
+
+    Devuelve (codes, k_per), ver _rgs_matrix. Mismo orden que rgs_all.
+    """
+    if n < 0:
+        raise ValueError("n debe ser >= 0")
+    return _rgs_matrix(n, 0, n)
+
+
+def rgs_exactly_array(n: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Versión de rgs_exactly que devuelve las RGS con exactamente k bloques
+    como arreglos.
+
+    Devuelve (codes, k_per), ver _rgs_matrix. Mismo orden que rgs_exactly.
+    """
+    if not (0 <= k <= n):
+        return np.zeros((0, max(n, 0)), dtype=np.int8), np.zeros(0, dtype=np.int8)
+    return _rgs_matrix(n, k, k)
+
+
+# -------------------------------------------------------------
+# Conteo y acceso directo por índice (unranking)
+# -------------------------------------------------------------
+def _tabla_completaciones(n: int, k: int | None) -> List[List[int]]:
+    """
+    Tabla D con D[i][m] = número de formas de completar una RGS cuyas
+    posiciones 0..i-1 ya están fijadas y usan m etiquetas distintas.
+
+    Con k=None se cuentan todas las completaciones; con k dado, solo las
+    que terminan con exactamente k bloques. Recurrencia:
+
+        D[i][m] = m * D[i+1][m] + D[i+1][m+1]
+
+    (repetir una de las m etiquetas usadas o abrir una nueva).
+    """
+    D = [[0] * (n + 2) for _ in range(n + 1)]
+    for m in range(n + 2):
+        D[n][m] = 1 if (k is None or m == k) else 0
+    for i in range(n - 1, -1, -1):
+        for m in range(n + 1):
+            D[i][m] = m * D[i + 1][m] + D[i + 1][m + 1]
+    return D
+
+
+def rgs_count(n: int, k: int | None = None) -> int:
+    """
+    Número de RGS de longitud n: B(n) (Bell) si k es None, S(n, k) si no.
+
+    Es la longitud de rgs_all(n) / rgs_exactly(n, k), calculada sin
+    enumerar nada.
+    """
+    if n < 0:
+        raise ValueError("n debe ser >= 0")
+    if n == 0:
+        return 1 if k in (None, 0) else 0
+    if k is not None and not (1 <= k <= n):
+        return 0
+    return _tabla_completaciones(n, k)[1][1]
+
+
+def rgs_nth(n: int, k: int | None, idx: int) -> List[int]:
+    """
+    Devuelve la RGS número idx (desde 0) en orden lexicográfico, sin
+    generar las anteriores.
+
+    Parámetros:
+        n   : tamaño del conjunto {1..n}.
+        k   : número de bloques (None → entre todas las particiones).
+        idx : posición, 0 <= idx < rgs_count(n, k).
+
+    Es el mismo orden que rgs_all (k=None) y rgs_exactly (k dado). Coste
+    O(n^2) por la tabla de completaciones, independiente de idx.
+    """
+    total = rgs_count(n, k)
+    if not (0 <= idx < total):
+        raise IndexError(f"índice {idx} fuera de rango (0..{total - 1})")
+    if n == 0:
+        return []
+
+    D = _tabla_completaciones(n, k)
+    a = [0] * n
+    m = 1  # etiquetas usadas tras fijar a[0] = 0
+    for i in range(1, n):
+        # Cada etiqueta ya usada abre un subárbol de D[i+1][m] RGS
+        por_etiqueta = D[i + 1][m]
+        if idx < m * por_etiqueta:
+            a[i], idx = divmod(idx, por_etiqueta)
+        else:
+            # Etiqueta nueva (la mayor posible en esta posición)
+            idx -= m * por_etiqueta
+            a[i] = m
+            m += 1
+    return a
+
+
+# -------------------------------------------------------------
+# Enumeración por lotes y por rangos (para n grandes)
+# -------------------------------------------------------------
+def _prefijos(
+    n: int, k: int | None, max_filas: int
+) -> Tuple[int, np.ndarray, np.ndarray, List[int]]:
+    """
+    Prefijos comunes de rgs_batches y rgs_slice_array (n >= 1 y k válido).
+
+    Elige el menor p con el que ningún prefijo de longitud p tiene más de
+    max_filas continuaciones (contadas con _tabla_completaciones) y
+    construye todos esos prefijos en orden lexicográfico.
+
+    Devuelve (p, prefijos, maxes, conteos): prefijos y maxes como en
+    _extender, y conteos[j] = número de RGS completas que empiezan por el
+    prefijo j (entero de Python, sin desbordamiento).
+    """
+    kmin, kmax = (0, n) if k is None else (k, k)
+    D = _tabla_completaciones(n, k)
+    p = next(
+        (p for p in range(1, n + 1) if max(D[p][1:p + 1]) <= max_filas),
+        n,
+    )
+    prefijos = np.zeros((1, n), dtype=np.int8)
+    maxes = np.zeros(1, dtype=np.intp)
+    prefijos, maxes = _extender(prefijos, maxes, 1, p, n, kmin, kmax)
+    conteos = [D[p][m + 1] for m in maxes.tolist()]
+    return p, prefijos, maxes, conteos
+
+
+def rgs_batches(
+    n: int, k: int | None = None, max_filas: int = 65536
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Igual que rgs_all_array (k=None) o rgs_exactly_array (k dado), pero
+    en lotes de a lo sumo max_filas RGS, para valores de n en los que la
+    matriz completa no cabe en memoria (B(15) ≈ 1.4·10^9 filas).
+
+    Cada lote es un par (codes, k_per) como los de _rgs_matrix, y
+    concatenarlos en orden da exactamente la matriz completa. Dentro de
+    cada lote el trabajo es vectorizado: el coste de Python se paga una
+    vez por lote, no por RGS.
+
+    Se fijan primero los prefijos (ver _prefijos) y se agrupan prefijos
+    consecutivos mientras sus continuaciones quepan en un lote; cada
+    grupo se completa con _extender.
+    """
+    if n < 0:
+        raise ValueError("n debe ser >= 0")
+    if max_filas < 1:
+        raise ValueError("max_filas debe ser >= 1")
+    kmin, kmax = (0, n) if k is None else (k, k)
+    if n == 0:
+        # Solo la RGS vacía (si k lo admite): un único lote
+        codes, k_per = _rgs_matrix(0, kmin, kmax)
+        if len(codes):
+            yield codes, k_per
+        return
+    if k is not None and not (1 <= k <= n):
+        return
+
+    p, prefijos, maxes, conteos = _prefijos(n, k, max_filas)
+
+    inicio = 0
+    while inicio < len(prefijos):
+        # Agrupar prefijos consecutivos (al menos uno) hasta llenar el lote
+        fin, filas = inicio, 0
+        while fin < len(prefijos):
+            if fin > inicio and filas + conteos[fin] > max_filas:
+                break
+            filas += conteos[fin]
+            fin += 1
+
+        codes, m = _extender(prefijos[inicio:fin], maxes[inicio:fin], p, n, n, kmin, kmax)
+        if len(codes):
+            yield codes, (m + 1).astype(np.int8)
+        inicio = fin
+
+
+def rgs_slice_array(
+    n: int, k: int | None, inicio: int, fin: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Filas inicio..fin-1 de rgs_all_array (k=None) o rgs_exactly_array
+    (k dado), calculadas sin generar las anteriores.
+
+    Como rgs_nth, se sitúa en el orden lexicográfico contando: con los
+    tamaños de cada prefijo (ver _prefijos) se localizan los prefijos
+    que cubren el rango y solo esos se completan. Así rangos disjuntos,
+    por ejemplo [0, B/P), [B/P, 2B/P), ..., son independientes entre sí
+    y se pueden repartir entre varios procesos; concatenarlos en orden
+    da la enumeración completa.
+
+    Los índices se recortan a [0, rgs_count(n, k)], como en un slice.
+    """
+    if n < 0:
+        raise ValueError("n debe ser >= 0")
+    total = rgs_count(n, k)
+    inicio, fin = max(inicio, 0), min(fin, total)
+    if inicio >= fin:
+        return np.zeros((0, n), dtype=np.int8), np.zeros(0, dtype=np.int8)
+    if n == 0:
+        return _rgs_matrix(0, 0, 0)
+
+    kmin, kmax = (0, n) if k is None else (k, k)
+    # Prefijos con pocas continuaciones: se completa como mucho un
+    # prefijo de más por cada extremo del rango
+    p, prefijos, maxes, conteos = _prefijos(n, k, max(fin - inicio, 65536))
+
+    # Prefijos j con alguna fila en [inicio, fin): [primero, ultimo)
+    acumulado = 0
+    primero = ultimo = None
+    for j, conteo in enumerate(conteos):
+        if primero is None and acumulado + conteo > inicio:
+            primero, desde = j, inicio - acumulado
+        acumulado += conteo
+        if acumulado >= fin:
+            ultimo = j + 1
+            break
+
+    codes, m = _extender(prefijos[primero:ultimo], maxes[primero:ultimo], p, n, n, kmin, kmax)
+    filas = slice(desde, desde + fin - inicio)
+    return codes[filas], (m[filas] + 1).astype(np.int8)
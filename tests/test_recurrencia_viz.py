@@ -0,0 +1,131 @@
+import unittest
+from collections import Counter
+
+import numpy as np
+
+import recurrencia_viz
+
+
+def _traza_recursiva(n, k, y_step=-1.3):
+    """
+    Traza de referencia construida con la recursión directa, como la
+    versión original con nodos enlazados: índices en preorden, x en
+    inorden (0, 1, 2, ...) e y = profundidad · y_step.
+    """
+    nodes, edges, positions = [], [], []
+    siguiente_x = [0]
+
+    def visitar(ni, ki, profundidad, padre, lado):
+        idx = len(nodes)
+        nodes.append((ni, ki))
+        positions.append(None)
+        if padre is not None:
+            edges.append((padre, idx, lado))
+        recursivo = 0 < ki < ni
+        if recursivo:
+            visitar(ni - 1, ki, profundidad + 1, idx, "left")
+        positions[idx] = (float(siguiente_x[0]), profundidad * y_step)
+        siguiente_x[0] += 1
+        if recursivo:
+            visitar(ni - 1, ki - 1, profundidad + 1, idx, "right")
+
+    visitar(n, k, 0, None, None)
+    return nodes, edges, positions
+
+
+# -------------------------------------------------------------------
+# Traza del árbol completo (_build_flat_tree / ArbolPlano)
+# -------------------------------------------------------------------
+class TestBuildRecurrenceTrace(unittest.TestCase):
+    def test_igual_que_la_recursion(self):
+        for n in range(0, 11):
+            for k in range(0, n + 1):
+                nodes, edges, positions = recurrencia_viz.build_recurrence_trace(n, k)
+                ref_nodes, ref_edges, ref_positions = _traza_recursiva(n, k)
+                self.assertEqual(nodes, ref_nodes, (n, k))
+                self.assertEqual(edges, ref_edges, (n, k))
+                np.testing.assert_allclose(positions, ref_positions, err_msg=str((n, k)))
+
+    def test_arista_j_llega_al_nodo_j_mas_1(self):
+        _, edges, _ = recurrencia_viz.build_recurrence_trace(7, 3)
+        self.assertEqual([hijo for _, hijo, _ in edges], list(range(1, len(edges) + 1)))
+
+    def test_parametros_invalidos(self):
+        for n, k in [(-1, 0), (3, -1), (3, 4)]:
+            self.assertEqual(recurrencia_viz.build_recurrence_trace(n, k), ([], [], []))
+
+
+# -------------------------------------------------------------------
+# Vista compacta (build_recurrence_dag / multiplicidades_dag)
+# -------------------------------------------------------------------
+class TestRecurrenceDag(unittest.TestCase):
+    def test_multiplicidades_igual_que_apariciones_en_el_arbol(self):
+        for n in range(0, 11):
+            for k in range(0, n + 1):
+                nodes, edges, _ = recurrencia_viz.build_recurrence_dag(n, k)
+                traza, aristas_traza, _ = recurrencia_viz.build_recurrence_trace(n, k)
+                apariciones = Counter(traza)
+                # Un nodo por llamada distinta, con tantas llamadas como
+                # veces aparece en el árbol completo
+                self.assertEqual(len(nodes), len(apariciones), (n, k))
+                self.assertEqual(
+                    dict(zip(nodes, recurrencia_viz.multiplicidades_dag(nodes, edges))),
+                    dict(apariciones),
+                    (n, k),
+                )
+                # Las aristas son las del árbol sin repetir
+                self.assertEqual(
+                    {(nodes[p], nodes[h], lado) for p, h, lado in edges},
+                    {(traza[p], traza[h], lado) for p, h, lado in aristas_traza},
+                    (n, k),
+                )
+                self.assertEqual(len(edges), len(set(edges)), (n, k))
+
+    def test_caso_a_mano(self):
+        # S(4,2) → S(3,2), S(3,1); ambos llaman a S(2,1), y S(2,1) a S(1,1) y S(1,0)
+        nodes, edges, _ = recurrencia_viz.build_recurrence_dag(4, 2)
+        mult = dict(zip(nodes, recurrencia_viz.multiplicidades_dag(nodes, edges)))
+        self.assertEqual(
+            mult,
+            {(4, 2): 1, (3, 2): 1, (3, 1): 1, (2, 2): 1, (2, 1): 2, (2, 0): 1, (1, 1): 2, (1, 0): 2},
+        )
+
+
+# -------------------------------------------------------------------
+# Tamaño del árbol de llamadas
+# -------------------------------------------------------------------
+class TestContarNodosArbol(unittest.TestCase):
+    def test_igual_que_la_traza_completa(self):
+        for n in range(0, 10):
+            for k in range(0, n + 1):
+                nodes, _, _ = recurrencia_viz.build_recurrence_trace(n, k)
+                self.assertEqual(
+                    recurrencia_viz.contar_nodos_arbol(n, k), len(nodes), (n, k)
+                )
+
+    def test_parametros_invalidos(self):
+        for n, k in [(-1, 0), (3, -1), (3, 4)]:
+            self.assertEqual(recurrencia_viz.contar_nodos_arbol(n, k), 0)
+
+    def test_limite_es_el_mayor_arbol_con_max_n(self):
+        n = recurrencia_viz.MAX_N_ARBOL
+        mayor = max(
+            len(recurrencia_viz.build_recurrence_trace(n, k)[0]) for k in range(n + 1)
+        )
+        self.assertEqual(recurrencia_viz.MAX_NODOS_ARBOL, mayor)
+
+    def test_mismo_limite_en_info_y_dibujo(self):
+        # Árboles con n > MAX_N_ARBOL pero pocos nodos (k = 1, k = n) se
+        # construyen; los que pasan de MAX_NODOS_ARBOL, no
+        for n in range(recurrencia_viz.MAX_N_ARBOL - 1, recurrencia_viz.MAX_N_ARBOL + 4):
+            for k in range(0, n + 1):
+                total = recurrencia_viz.contar_nodos_arbol(n, k)
+                esperado = total if total <= recurrencia_viz.MAX_NODOS_ARBOL else 0
+                info = recurrencia_viz.get_node_info(n, k, 0)
+                self.assertEqual(info["total_nodes"], esperado, (n, k))
+                _, total_dibujo = recurrencia_viz.dibujar_arbol_recurrencia(n, k)
+                self.assertEqual(total_dibujo, esperado, (n, k))
+
+
+if __name__ == "__main__":
+    unittest.main()
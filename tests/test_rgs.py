@@ -0,0 +1,192 @@
+import random
+import unittest
+
+import numpy as np
+
+import rgs
+
+
+# -------------------------------------------------------------
+# Acceso por índice (rgs_nth)
+# -------------------------------------------------------------
+class TestRgsNth(unittest.TestCase):
+    def test_todas_igual_que_rgs_all(self):
+        for n in range(0, 8):
+            esperadas = list(rgs.rgs_all(n))
+            self.assertEqual(len(esperadas), rgs.rgs_count(n))
+            for i, rgs_i in enumerate(esperadas):
+                self.assertEqual(rgs.rgs_nth(n, None, i), rgs_i, (n, i))
+
+    def test_k_bloques_igual_que_rgs_exactly(self):
+        for n in range(1, 8):
+            for k in range(1, n + 1):
+                esperadas = list(rgs.rgs_exactly(n, k))
+                self.assertEqual(len(esperadas), rgs.rgs_count(n, k))
+                for i, rgs_i in enumerate(esperadas):
+                    self.assertEqual(rgs.rgs_nth(n, k, i), rgs_i, (n, k, i))
+
+    def test_indice_fuera_de_rango(self):
+        for n, k in [(4, None), (4, 2), (5, 5)]:
+            total = rgs.rgs_count(n, k)
+            with self.assertRaises(IndexError):
+                rgs.rgs_nth(n, k, total)
+            with self.assertRaises(IndexError):
+                rgs.rgs_nth(n, k, -1)
+
+
+def _num_bloques(a):
+    """Número de bloques de una RGS (0 para la RGS vacía)."""
+    return max(a) + 1 if a else 0
+
+
+# -------------------------------------------------------------
+# Generadores por número de bloques (X, Y, Z) contra rgs_all
+# -------------------------------------------------------------
+class TestGeneradoresPorBloques(unittest.TestCase):
+    def setUp(self):
+        self.todas = {n: list(rgs.rgs_all(n)) for n in range(0, 10)}
+
+    def _filtro(self, n, kmin, kmax):
+        """RGS de rgs_all con kmin..kmax bloques, en el orden de rgs_all."""
+        return [a for a in self.todas[n] if kmin <= _num_bloques(a) <= kmax]
+
+    def test_exactamente_k_bloques(self):
+        for n in self.todas:
+            for k in range(0, n + 1):
+                esperadas = self._filtro(n, k, k)
+                self.assertEqual(list(rgs.rgs_exactly(n, k)), esperadas, (n, k))
+                self.assertEqual(list(rgs.rgs_exactly_y(n, k)), esperadas, (n, k))
+
+    def test_rango_de_bloques(self):
+        for n in self.todas:
+            for kmax in range(0, n + 1):
+                # kmin = 0: como mucho kmax bloques
+                for kmin in range(0, kmax + 1):
+                    self.assertEqual(
+                        list(rgs.rgs_range(n, kmin, kmax)),
+                        self._filtro(n, kmin, kmax),
+                        (n, kmin, kmax),
+                    )
+
+    def test_bloques_igual_que_rgs_to_blocks(self):
+        for n in range(0, 7):
+            for k in range(0, n + 1):
+                esperadas = [rgs.rgs_to_blocks(a) for a in self._filtro(n, k, k)]
+                for generador in (rgs.rgs_exactly, rgs.rgs_exactly_y):
+                    self.assertEqual(
+                        list(generador(n, k, yield_blocks=True)), esperadas, (generador, n, k)
+                    )
+
+    def test_k_fuera_de_rango(self):
+        for n, k in [(3, -1), (3, 4)]:
+            self.assertEqual(list(rgs.rgs_exactly(n, k)), [])
+            self.assertEqual(list(rgs.rgs_exactly_y(n, k)), [])
+        self.assertEqual(list(rgs.rgs_range(3, 2, 1)), [])
+        with self.assertRaises(ValueError):
+            list(rgs.rgs_range(-1, 0, 0))
+
+
+# -------------------------------------------------------------
+# Constructores NumPy contra los generadores
+# -------------------------------------------------------------
+class TestMatricesRgs(unittest.TestCase):
+    def _comprobar(self, codes, k_per, esperadas, n, caso):
+        self.assertEqual(codes.dtype, np.int8, caso)
+        self.assertEqual(codes.shape, (len(esperadas), n), caso)
+        self.assertEqual(codes.tolist(), esperadas, caso)
+        self.assertEqual(k_per.tolist(), [_num_bloques(a) for a in esperadas], caso)
+
+    def test_rgs_all_array(self):
+        for n in range(0, 10):
+            codes, k_per = rgs.rgs_all_array(n)
+            self._comprobar(codes, k_per, list(rgs.rgs_all(n)), n, n)
+
+    def test_rgs_exactly_array(self):
+        for n in range(0, 10):
+            for k in range(0, n + 1):
+                codes, k_per = rgs.rgs_exactly_array(n, k)
+                self._comprobar(codes, k_per, list(rgs.rgs_exactly(n, k)), n, (n, k))
+
+
+def _matriz_completa(n, k):
+    """Matriz de referencia: rgs_all_array (k=None) o rgs_exactly_array."""
+    return rgs.rgs_all_array(n) if k is None else rgs.rgs_exactly_array(n, k)
+
+
+def _casos(max_n):
+    """Pares (n, k) con k=None y todos los k válidos, para n <= max_n."""
+    for n in range(0, max_n + 1):
+        yield n, None
+        for k in range(1, n + 1):
+            yield n, k
+
+
+# -------------------------------------------------------------
+# Enumeración por lotes (rgs_batches)
+# -------------------------------------------------------------
+class TestRgsBatches(unittest.TestCase):
+    def test_lotes_concatenados_igual_que_matriz_completa(self):
+        for n, k in _casos(8):
+            codes, k_per = _matriz_completa(n, k)
+            for max_filas in (1, 3, 7, 50, 65536):
+                lotes = list(rgs.rgs_batches(n, k, max_filas=max_filas))
+                for lote_codes, lote_k in lotes:
+                    self.assertLessEqual(len(lote_codes), max_filas, (n, k, max_filas))
+                    self.assertEqual(len(lote_codes), len(lote_k))
+                if not lotes:
+                    self.assertEqual(len(codes), 0, (n, k))
+                    continue
+                np.testing.assert_array_equal(
+                    np.concatenate([c for c, _ in lotes]), codes, err_msg=str((n, k, max_filas))
+                )
+                np.testing.assert_array_equal(
+                    np.concatenate([m for _, m in lotes]), k_per, err_msg=str((n, k, max_filas))
+                )
+
+    def test_max_filas_invalido(self):
+        with self.assertRaises(ValueError):
+            list(rgs.rgs_batches(4, max_filas=0))
+
+
+# -------------------------------------------------------------
+# Enumeración por rangos (rgs_slice_array)
+# -------------------------------------------------------------
+class TestRgsSliceArray(unittest.TestCase):
+    def _comprobar(self, n, k, codes, k_per, lo, hi):
+        tramo_codes, tramo_k = rgs.rgs_slice_array(n, k, lo, hi)
+        np.testing.assert_array_equal(tramo_codes, codes[lo:hi], err_msg=str((n, k, lo, hi)))
+        np.testing.assert_array_equal(tramo_k, k_per[lo:hi], err_msg=str((n, k, lo, hi)))
+
+    def test_rangos_aleatorios_igual_que_matriz_completa(self):
+        azar = random.Random(12345)
+        for n, k in _casos(8):
+            codes, k_per = _matriz_completa(n, k)
+            total = len(codes)
+            for _ in range(20):
+                lo = azar.randint(0, total)
+                hi = azar.randint(lo, total)
+                self._comprobar(n, k, codes, k_per, lo, hi)
+
+    def test_extremos(self):
+        for n, k in _casos(7):
+            codes, k_per = _matriz_completa(n, k)
+            total = len(codes)
+            self._comprobar(n, k, codes, k_per, 0, total)   # todo
+            self._comprobar(n, k, codes, k_per, 0, 1)       # primera fila
+            self._comprobar(n, k, codes, k_per, total - 1, total)  # última fila
+            for lo in (0, total // 2, total):               # lo == hi: vacío
+                self._comprobar(n, k, codes, k_per, lo, lo)
+
+    def test_indices_se_recortan_al_rango_valido(self):
+        codes, k_per = rgs.rgs_all_array(5)
+        total = len(codes)
+        tramo_codes, _ = rgs.rgs_slice_array(5, None, -3, 4)
+        np.testing.assert_array_equal(tramo_codes, codes[0:4])
+        tramo_codes, _ = rgs.rgs_slice_array(5, None, total - 2, total + 10)
+        np.testing.assert_array_equal(tramo_codes, codes[total - 2:])
+        tramo_codes, _ = rgs.rgs_slice_array(5, None, 7, 3)
+        self.assertEqual(tramo_codes.shape, (0, 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+import rgs
+import viz
+
+
+def _pixeles(fig) -> np.ndarray:
+    """Dibuja la figura en su canvas Agg y devuelve sus píxeles RGBA."""
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba()).copy()
+
+
+# ---------------------------------------------------------
+# Rejilla de particiones (dibujar_particiones_en_grid)
+# ---------------------------------------------------------
+class TestDibujarParticionesEnGrid(unittest.TestCase):
+    def setUp(self):
+        self.particiones = list(rgs.rgs_all(4, yield_blocks=True))
+
+    def test_generador_igual_que_lista(self):
+        fig_lista = viz.dibujar_particiones_en_grid(self.particiones)
+        fig_gen = viz.dibujar_particiones_en_grid(rgs.rgs_all(4, yield_blocks=True), n=4)
+        np.testing.assert_array_equal(_pixeles(fig_gen), _pixeles(fig_lista))
+
+    def test_total_limita_y_consume_solo_lo_necesario(self):
+        generador = rgs.rgs_all(4, yield_blocks=True)
+        fig = viz.dibujar_particiones_en_grid(generador, n=4, total=5)
+        referencia = viz.dibujar_particiones_en_grid(self.particiones[:5])
+        np.testing.assert_array_equal(_pixeles(fig), _pixeles(referencia))
+        # El generador sigue en la sexta partición
+        self.assertEqual(next(generador), self.particiones[5])
+
+    def test_total_mayor_que_el_iterable(self):
+        fig = viz.dibujar_particiones_en_grid(iter(self.particiones[:4]), n=4, total=100)
+        referencia = viz.dibujar_particiones_en_grid(self.particiones[:4])
+        # 4 particiones → 2 filas x 3 columnas, no 34 filas
+        self.assertEqual(len(fig.axes), 6)
+        np.testing.assert_array_equal(fig.get_size_inches(), referencia.get_size_inches())
+
+    def test_sin_particiones(self):
+        for particiones, total in [([], None), (iter([]), 5), (self.particiones, 0)]:
+            fig = viz.dibujar_particiones_en_grid(particiones, n=4, total=total)
+            self.assertEqual(len(fig.axes), 1)
+            self.assertEqual(fig.axes[0].texts[0].get_text(), "No hay particiones para mostrar")
+
+
+def _punto_medio_px(n, i, j, tile_px):
+    """
+    Píxel (fila, columna) de la baldosa en el punto medio de los elementos
+    i y j (0-based), con la misma escala que dibujar_particion: la
+    ventana [-1.3, 1.3]² ocupa el 92 % de la baldosa.
+    """
+    pos = viz._posiciones_array(n)
+    x, y = (pos[i] + pos[j]) / 2
+    escala = 0.92 * tile_px / 2.6
+    origen = 0.04 * tile_px + 1.3 * escala
+    return int(tile_px - (origen + escala * y)), int(origen + escala * x)
+
+
+# ---------------------------------------------------------
+# Atlas de particiones en píxeles (rasterizar_atlas)
+# ---------------------------------------------------------
+class TestRasterizarAtlas(unittest.TestCase):
+    TILE = 80
+
+    def _baldosas(self, atlas, total, cols):
+        t = self.TILE
+        return [
+            atlas[f * t:(f + 1) * t, c * t:(c + 1) * t]
+            for f, c in (divmod(i, cols) for i in range(total))
+        ]
+
+    def test_forma_y_tipo(self):
+        codes, _ = rgs.rgs_all_array(4)   # 15 particiones
+        for max_cols, forma in [(3, (5, 3)), (4, (4, 4)), (20, (1, 15))]:
+            atlas = viz.rasterizar_atlas(codes, max_cols=max_cols, tile_px=self.TILE)
+            self.assertEqual(atlas.dtype, np.uint8)
+            self.assertEqual(atlas.shape, (forma[0] * self.TILE, forma[1] * self.TILE, 3))
+
+    def test_sin_particiones(self):
+        for codes in (np.zeros((0, 4), dtype=np.int8), np.zeros((1, 0), dtype=np.int8)):
+            atlas = viz.rasterizar_atlas(codes, tile_px=self.TILE)
+            self.assertEqual(atlas.shape, (self.TILE, self.TILE, 3))
+            self.assertFalse(atlas.any())
+
+    def test_baldosa_no_depende_de_su_posicion(self):
+        codes, _ = rgs.rgs_all_array(4)
+        atlas = viz.rasterizar_atlas(codes, tile_px=self.TILE)
+        for t, baldosa in enumerate(self._baldosas(atlas, len(codes), 3)):
+            sola = viz.rasterizar_atlas(codes[t:t + 1], tile_px=self.TILE)
+            np.testing.assert_array_equal(baldosa, sola, err_msg=str(codes[t]))
+
+    def test_un_bloque_y_todo_unitarios_son_distintas(self):
+        codes = np.array([[0, 0, 0, 0], [0, 1, 2, 3]], dtype=np.int8)
+        un_bloque, unitarios = self._baldosas(
+            viz.rasterizar_atlas(codes, tile_px=self.TILE), 2, 2
+        )
+        self.assertFalse(np.array_equal(un_bloque, unitarios))
+
+    def test_nubes_siguen_los_bloques(self):
+        # Entre dos elementos consecutivos del círculo solo hay nube si
+        # están en el mismo bloque, y es del color de ese bloque
+        for n in (4, 5):
+            codes, k_per = rgs.rgs_all_array(n)
+            atlas = viz.rasterizar_atlas(codes, tile_px=self.TILE)
+            for fila, k, baldosa in zip(codes, k_per, self._baldosas(atlas, len(codes), 3)):
+                colores = plt.cm.hsv(np.arange(k) / k)[:, :3]
+                for i in range(n):
+                    j = (i + 1) % n
+                    pixel = baldosa[_punto_medio_px(n, i, j, self.TILE)].astype(float)
+                    caso = (fila.tolist(), i, j)
+                    if fila[i] != fila[j]:
+                        self.assertFalse(pixel.any(), caso)
+                        continue
+                    # Color del bloque con la transparencia de la nube
+                    color = colores[fila[i]] * 255.0
+                    alfa = pixel @ color / (color @ color)
+                    self.assertGreater(alfa, 0.2, caso)
+                    np.testing.assert_allclose(pixel, alfa * color, atol=3, err_msg=str(caso))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,13 @@
 import math
-from typing import Dict, List, Tuple
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Iterable, List, Tuple
 
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PatchCollection
+from matplotlib.figure import Figure
 from matplotlib.patches import Polygon, Circle
 
 # -------------------------------------------------------------------
@@ -22,6 +27,25 @@ from matplotlib.patches import Polygon, Circle
 # ---------------------------------------------------------
 # Posiciones base: puntos en círculo (polígono regular)
 # ---------------------------------------------------------
+@lru_cache(maxsize=64)
+def _posiciones_array(n: int) -> np.ndarray:
+    """
+    Posiciones de generar_posiciones como arreglo (n, 2): la fila i - 1
+    es el punto del elemento i. Se calcula de forma vectorizada una sola
+    vez por n y se devuelve de solo lectura (se comparte entre llamadas).
+    """
+    if n <= 1:
+        # Ningún elemento, o uno solo en el centro
+        xy = np.zeros((max(n, 0), 2))
+    else:
+        # Distribuimos los puntos uniformemente formando un polígono regular
+        # (radio 1)
+        ang = 2 * math.pi * np.arange(n) / n
+        xy = np.column_stack((np.cos(ang), np.sin(ang)))
+    xy.setflags(write=False)
+    return xy
+
+
 def generar_posiciones(n: int) -> Dict[int, Tuple[float, float]]:
     """
     Genera posiciones (x, y) para los elementos 1..n sobre un círculo unitario.
@@ -36,22 +60,9 @@ def generar_posiciones(n: int) -> Dict[int, Tuple[float, float]]:
         Los puntos se distribuyen uniformemente en el ángulo, formando
         un polígono regular inscrito en un círculo de radio 1.
     """
-    posiciones: Dict[int, Tuple[float, float]] = {}
     if n <= 0:
-        return posiciones
-    if n == 1:
-        # Un solo elemento en el centro
-        posiciones[1] = (0.0, 0.0)
-        return posiciones
-
-    radio = 1.0
-    for i in range(1, n + 1):
-        # Distribuimos los puntos uniformemente formando un polígono regular
-        ang = 2 * math.pi * (i - 1) / n
-        x = radio * math.cos(ang)
-        y = radio * math.sin(ang)
-        posiciones[i] = (x, y)
-    return posiciones
+        return {}
+    return dict(enumerate(map(tuple, _posiciones_array(n).tolist()), start=1))
 
 
 # ---------------------------------------------------------
@@ -76,8 +87,9 @@ def _convex_hull(points: np.ndarray) -> np.ndarray:
     if len(points) <= 1:
         return points
 
-    # Ordenar por x, luego por y
-    pts = np.array(sorted(points.tolist()))
+    # Ordenar por x, luego por y (en NumPy); el recorrido usa listas de
+    # floats de Python, más rápidas de leer elemento a elemento
+    pts = points[np.lexsort((points[:, 1], points[:, 0]))].tolist()
 
     # Construir parte baja (lower hull)
     lower = []
@@ -92,7 +104,7 @@ def _convex_hull(points: np.ndarray) -> np.ndarray:
                 lower.pop()
             else:
                 break
-        lower.append(tuple(p))
+        lower.append(p)
 
     # Construir parte alta (upper hull)
     upper = []
@@ -106,13 +118,30 @@ def _convex_hull(points: np.ndarray) -> np.ndarray:
                 upper.pop()
             else:
                 break
-        upper.append(tuple(p))
+        upper.append(p)
 
     # Quitar el último de cada lista (está repetido en la unión)
     hull = np.array(lower[:-1] + upper[:-1])
     return hull
 
 
+# Signo del desplazamiento normal de cada vértice del cinturón (p1, p2, p2, p1)
+_SIGNOS_CINTURON = np.array([[1.0], [1.0], [-1.0], [-1.0]])
+
+
+def _cinturon(pts: np.ndarray, ancho: float = 0.15) -> np.ndarray:
+    """
+    "Cinturón" rectangular (4, 2) alrededor del segmento entre los dos
+    puntos de pts: p1 + d, p2 + d, p2 - d, p1 - d, con d el vector normal
+    al segmento de longitud `ancho`. Los cuatro vértices salen de una sola
+    operación con _SIGNOS_CINTURON, sin un array temporal por vértice.
+    """
+    vx, vy = (pts[1] - pts[0]).tolist()
+    norm = math.hypot(vx, vy) or 1.0
+    desp = ancho * np.array([-vy / norm, vx / norm])
+    return pts[[0, 1, 1, 0]] + _SIGNOS_CINTURON * desp
+
+
 # ---------------------------------------------------------
 # Dibujo de la partición con nubes poligonales
 # ---------------------------------------------------------
@@ -138,8 +167,11 @@ def dibujar_particion(
     """
     own_axis = ax is None
     if own_axis:
-        # Canvas compacto + fondo negro
-        fig, ax = plt.subplots(figsize=(5, 5))
+        # Canvas compacto + fondo negro (figura fuera de pyplot: no queda
+        # registrada y se libera al dejar de usarse)
+        fig = Figure(figsize=(5, 5))
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
     else:
         fig = ax.figure
 
@@ -163,81 +195,51 @@ def dibujar_particion(
         return fig
 
     num_bloques = len(particion)
+    # Color único por bloque (mapa HSV), calculado de una vez para todos
+    colores = plt.cm.hsv(np.arange(num_bloques) / num_bloques)
+
+    # Nubes y puntos de todos los bloques se acumulan y se añaden al final
+    # como una sola colección cada uno (un artista por tipo, no por bloque)
+    nubes: List = []
+    colores_nubes: List = []
+    puntos: List[np.ndarray] = []
+    colores_puntos: List = []
 
     for idx_bloque, bloque in enumerate(particion):
-        # Color único por bloque — usamos el mapa de colores HSV
-        color = plt.cm.hsv(idx_bloque / num_bloques)
-
-        xs: List[float] = []
-        ys: List[float] = []
-        for elem in bloque:
-            if elem in posiciones:
-                x, y = posiciones[elem]
-                xs.append(x)
-                ys.append(y)
-
-        if not xs:
+        color = colores[idx_bloque]
+
+        # Elementos del bloque con posición y sus puntos como array (m,2),
+        # en un solo paso
+        elementos = [elem for elem in bloque if elem in posiciones]
+        if not elementos:
             # Bloque vacío o elementos sin posición (no debería pasar)
             continue
-
-        # Puntos de este bloque como array (m,2)
-        pts = np.column_stack((xs, ys))
+        pts = np.array([posiciones[elem] for elem in elementos], dtype=float)
 
         # ===== NUBES (regiones coloreadas alrededor del bloque) =====
         if len(pts) == 1:
             # Un solo punto: lo rodeamos con un círculo ("burbuja")
             cx, cy = pts[0]
-            burbuja = Circle(
-                (cx, cy), radius=0.20,
-                facecolor=color, alpha=0.30,
-                edgecolor=color, linewidth=1.2, zorder=1
-            )
-            ax.add_patch(burbuja)
+            burbuja = Circle((cx, cy), radius=0.20)
 
         elif len(pts) == 2:
             # Dos puntos: construimos un "cinturón" rectangular alrededor del segmento
-            p1, p2 = pts
-            vx, vy = p2 - p1
-            norm = math.hypot(vx, vy) or 1.0
-            # Vector normal unitario para dar espesor
-            nx, ny = -vy / norm, vx / norm
-            ancho = 0.15
-            poly_pts = np.array([
-                p1 + ancho * np.array([nx, ny]),
-                p2 + ancho * np.array([nx, ny]),
-                p2 - ancho * np.array([nx, ny]),
-                p1 - ancho * np.array([nx, ny]),
-            ])
-            burbuja = Polygon(
-                poly_pts, closed=True,
-                facecolor=color, alpha=0.30,
-                edgecolor=color, linewidth=1.2, zorder=1
-            )
-            ax.add_patch(burbuja)
+            burbuja = Polygon(_cinturon(pts), closed=True)
 
         else:
             # Tres o más puntos: usamos la envolvente convexa como "nube"
             hull = _convex_hull(pts)
-            burbuja = Polygon(
-                hull, closed=True,
-                facecolor=color, alpha=0.30,
-                edgecolor=color, linewidth=1.2, zorder=1
-            )
-            ax.add_patch(burbuja)
+            burbuja = Polygon(hull, closed=True)
+
+        nubes.append(burbuja)
+        colores_nubes.append(color)
 
         # ===== PUNTOS =====
-        ax.scatter(
-            pts[:, 0], pts[:, 1],
-            s=150,
-            color=color,
-            alpha=1.0,
-            edgecolors="white",
-            linewidth=1.2,
-            zorder=2
-        )
+        puntos.append(pts)
+        colores_puntos.extend([color] * len(pts))
 
         # Numeritos del bloque sobre cada punto
-        for elem, (x, y) in zip(bloque, pts):
+        for elem, (x, y) in zip(elementos, pts.tolist()):
             ax.text(
                 x, y, str(elem),
                 ha="center", va="center",
@@ -246,6 +248,23 @@ def dibujar_particion(
                 zorder=3
             )
 
+    if nubes:
+        ax.add_collection(PatchCollection(
+            nubes,
+            facecolors=colores_nubes, edgecolors=colores_nubes,
+            alpha=0.30, linewidths=1.2, joinstyle="miter", zorder=1,
+        ))
+        todos = np.concatenate(puntos)
+        ax.scatter(
+            todos[:, 0], todos[:, 1],
+            s=150,
+            c=colores_puntos,
+            alpha=1.0,
+            edgecolors="white",
+            linewidth=1.2,
+            zorder=2
+        )
+
     # Opcionalmente se podrían ajustar límites y ejes aquí,
     # pero la app se encarga de encajarlo con use_container_width.
     if own_axis:
@@ -256,26 +275,40 @@ def dibujar_particion(
 
 
 def dibujar_particiones_en_grid(
-    particiones: List[List[List[int]]],
+    particiones: Iterable[List[List[int]]],
     n: int | None = None,
     max_cols: int = 3,
     figsize_unit: float = 3.3,
+    total: int | None = None,
 ):
     """Dibuja una lista de particiones en una rejilla de subplots.
 
     Parámetros:
-        particiones: lista con todas las particiones (cada una es lista de bloques).
+        particiones: particiones a dibujar (cada una es lista de bloques). Puede
+                     ser cualquier iterable, p. ej. un generador.
         n          : tamaño del conjunto {1..n}. Si es None se infiere del máximo
                      elemento encontrado en las particiones.
         max_cols   : número máximo de columnas en la rejilla.
         figsize_unit: tamaño base (en pulgadas) usado para calcular figsize
                       dinámico.
+        total      : máximo de particiones a dibujar. Si se da, solo se toman
+                     las primeras `total` del iterable (el resto ni se genera);
+                     si tiene menos, la rejilla se ajusta a las que haya.
 
     Devuelve:
         fig : objeto Figure con todos los subplots dibujados.
     """
-    if not particiones:
-        fig, ax = plt.subplots(figsize=(4, 3))
+    # Solo se guardan las particiones que se van a dibujar (cada una ocupa
+    # unos ejes de todas formas); la rejilla se dimensiona con las que hay
+    if total is not None:
+        particiones = islice(particiones, max(total, 0))
+    particiones = list(particiones)
+    total = len(particiones)
+
+    if total == 0:
+        fig = Figure(figsize=(4, 3))
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
         ax.text(0.5, 0.5, "No hay particiones para mostrar", ha="center", va="center")
         ax.axis("off")
         return fig
@@ -284,15 +317,12 @@ def dibujar_particiones_en_grid(
         n = max(max(bloque) for particion in particiones for bloque in particion)
 
     posiciones = generar_posiciones(n)
-    total = len(particiones)
     cols = max(1, min(max_cols, total))
     rows = math.ceil(total / cols)
 
-    fig, axes = plt.subplots(
-        rows,
-        cols,
-        figsize=(cols * figsize_unit, rows * figsize_unit),
-    )
+    fig = Figure(figsize=(cols * figsize_unit, rows * figsize_unit))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(rows, cols)
     fig.patch.set_facecolor("black")
     axes_flat = np.atleast_1d(axes).flatten()
 
@@ -310,3 +340,207 @@ def dibujar_particiones_en_grid(
 
     fig.tight_layout()
     return fig
+
+
+# ---------------------------------------------------------
+# Rasterizado directo con NumPy (sin artistas de matplotlib)
+# ---------------------------------------------------------
+# Medidas de la baldosa: equivale a una figura de tile_px a 100 dpi con
+# los ejes en [0.04, 0.04, 0.92, 0.92] y límites ±1.3.
+_DPI = 100
+_PT = _DPI / 72.0  # píxeles por punto tipográfico
+
+
+def _sprites_etiquetas(n: int, lado: int) -> List[np.ndarray]:
+    """
+    Máscaras alfa (lado x lado, float32 en [0,1]) con los números 1..n en
+    blanco, negrita, 10 pt, centrados. Se dibujan una sola vez con
+    matplotlib y luego solo se copian.
+    """
+    fig = Figure(figsize=(lado / _DPI, lado / _DPI), dpi=_DPI)
+    canvas = FigureCanvasAgg(fig)
+    fig.patch.set_alpha(0.0)
+    sprites = []
+    for elem in range(1, n + 1):
+        fig.clear()
+        fig.text(
+            0.5, 0.5, str(elem),
+            ha="center", va="center",
+            color="white", fontsize=10, fontweight="bold",
+        )
+        canvas.draw()
+        alfa = np.asarray(canvas.buffer_rgba())[:, :, 3]
+        sprites.append(alfa.astype(np.float32) / 255.0)
+    return sprites
+
+
+def _mezclar(destino: np.ndarray, color: np.ndarray, alfa: np.ndarray) -> None:
+    """Compone `color` sobre `destino` (float32, H x W x 3) con cobertura `alfa`."""
+    destino += alfa[..., None] * (color - destino)
+
+
+def _distancia_poligono(px: np.ndarray, py: np.ndarray, vertices: np.ndarray) -> np.ndarray:
+    """
+    Distancia con signo (positiva dentro) de cada píxel a un polígono
+    convexo. Fuera del polígono es una aproximación (esquinas en inglete,
+    igual que el borde por defecto de los parches de matplotlib).
+    """
+    vertices = vertices.astype(np.float32)
+    x0, y0 = vertices[:, 0], vertices[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    ex, ey = x1 - x0, y1 - y0
+    largo = np.hypot(ex, ey)
+    largo[largo == 0] = 1.0
+    # Orientación del polígono para que "dentro" sea positivo
+    signo = np.float32(1.0 if np.sum(x0 * y1 - x1 * y0) >= 0 else -1.0)
+    d = (ex[:, None, None] * (py - y0[:, None, None])
+         - ey[:, None, None] * (px - x0[:, None, None])) / largo[:, None, None]
+    return (signo * d).min(axis=0)
+
+
+def rasterizar_atlas(
+    codes: np.ndarray,
+    max_cols: int = 3,
+    tile_px: int = 330,
+) -> np.ndarray:
+    """Dibuja particiones (RGS) como atlas RGB operando directamente sobre píxeles.
+
+    Produce la misma figura que dibujar_particion (nubes
+    semitransparentes, puntos con borde blanco y números) pero sin crear
+    ni dibujar artistas de matplotlib por partición: las nubes son siempre regiones convexas
+    (círculo, "cinturón" o envolvente convexa), así que se rellenan con una
+    distancia con signo evaluada sobre la ventana de píxeles que ocupan;
+    los puntos son discos y los números se copian de máscaras dibujadas
+    una sola vez.
+
+    Parámetros:
+        codes   : matriz (M, n) con una RGS por fila (ver rgs.rgs_all_array).
+        max_cols: número máximo de columnas del atlas.
+        tile_px : lado (en píxeles) de la baldosa de cada partición.
+
+    Devuelve:
+        atlas : arreglo uint8 de forma (filas*tile_px, cols*tile_px, 3).
+    """
+    codes = np.asarray(codes)
+    total, n = codes.shape if codes.ndim == 2 else (0, 0)
+    if total == 0 or n == 0:
+        # Sin particiones, o solo la partición vacía (n = 0): una baldosa negra
+        return np.zeros((tile_px, tile_px, 3), dtype=np.uint8)
+
+    cols = max(1, min(max_cols, total))
+    rows = math.ceil(total / cols)
+
+    escala = 0.92 * tile_px / 2.6
+
+    # Medidas fijas de dibujar_particion, en píxeles
+    radio_burbuja = 0.20 * escala
+    borde_nube = 1.2 * _PT
+    radio_punto = math.sqrt(150) / 2 * _PT
+    borde_punto = 1.2 * _PT
+    margen = int(math.ceil(max(radio_burbuja, radio_punto) + borde_nube + 2))
+
+    lado_sprite = int(2 * radio_punto) + 8
+    sprites = _sprites_etiquetas(n, lado_sprite)
+
+    # Se dibuja en un lienzo con un relleno alrededor de la baldosa, para
+    # que ninguna ventana (disco, número) se salga del arreglo; al final
+    # se recorta la baldosa.
+    relleno_px = max(margen, lado_sprite)
+    lado_lienzo = tile_px + 2 * relleno_px
+
+    # Datos → píxeles del lienzo (x hacia la derecha, y hacia abajo)
+    origen = 0.04 * tile_px + 1.3 * escala
+
+    def a_pixel(xy: np.ndarray) -> np.ndarray:
+        xy = np.asarray(xy, dtype=np.float64)
+        return np.column_stack((relleno_px + origen + escala * xy[:, 0],
+                                relleno_px + tile_px - (origen + escala * xy[:, 1])))
+
+    puntos_datos = _posiciones_array(n)
+    puntos_px = a_pixel(puntos_datos)
+
+    # Ventana cuadrada para los discos de los puntos
+    r_int = int(math.ceil(radio_punto + borde_punto))
+    oy, ox = np.mgrid[-r_int:r_int + 1, -r_int:r_int + 1].astype(np.float32)
+
+    # Colores por número de bloques: mismos que plt.cm.hsv(idx / k)
+    paletas: Dict[int, np.ndarray] = {}
+
+    blanco = np.ones(3, dtype=np.float32)
+    atlas = np.zeros((rows * tile_px, cols * tile_px, 3), dtype=np.uint8)
+    tile = np.zeros((lado_lienzo, lado_lienzo, 3), dtype=np.float32)
+
+    for t in range(total):
+        fila_rgs = codes[t]
+        k = int(fila_rgs.max()) + 1
+        if k not in paletas:
+            paletas[k] = plt.cm.hsv(np.arange(k) / k)[:, :3].astype(np.float32)
+        colores = paletas[k]
+        tile[:] = 0.0
+
+        # Elementos de cada bloque (en orden de primera aparición = etiqueta)
+        bloques = [np.flatnonzero(fila_rgs == b) for b in range(k)]
+
+        # ===== NUBES =====
+        for b, miembros in enumerate(bloques):
+            pts = puntos_datos[miembros]
+            if len(pts) == 1:
+                cx, cy = a_pixel(pts)[0]
+                poligono = None
+                x_min, x_max, y_min, y_max = cx, cx, cy, cy
+            else:
+                if len(pts) == 2:
+                    verts = _cinturon(pts)
+                else:
+                    verts = _convex_hull(pts)
+                poligono = a_pixel(verts)
+                x_min, y_min = poligono.min(axis=0)
+                x_max, y_max = poligono.max(axis=0)
+
+            c0 = max(int(x_min) - margen, 0)
+            c1 = min(int(x_max) + margen + 1, lado_lienzo)
+            f0 = max(int(y_min) - margen, 0)
+            f1 = min(int(y_max) + margen + 1, lado_lienzo)
+            py, px = np.mgrid[f0:f1, c0:c1].astype(np.float32) + 0.5
+
+            if poligono is None:
+                d = radio_burbuja - np.hypot(px - cx, py - cy)
+            else:
+                d = _distancia_poligono(px, py, poligono)
+
+            # Relleno y borde tienen el mismo color y alfa 0.30: componer
+            # ambos equivale a una sola mezcla con alfa a1 + a2 - a1*a2
+            relleno = 0.30 * np.clip(d + 0.5, 0.0, 1.0)
+            trazo = 0.30 * np.clip(borde_nube / 2 - np.abs(d) + 0.5, 0.0, 1.0)
+            _mezclar(tile[f0:f1, c0:c1], colores[b], relleno + trazo - relleno * trazo)
+
+        # ===== PUNTOS =====
+        for b, miembros in enumerate(bloques):
+            for elem in miembros:
+                cx, cy = puntos_px[elem]
+                ci, fi = int(cx), int(cy)
+                f0, c0 = fi - r_int, ci - r_int
+                dist = np.hypot(ox + (ci + 0.5 - cx), oy + (fi + 0.5 - cy))
+                relleno = np.clip(radio_punto - dist + 0.5, 0.0, 1.0)
+                trazo = np.clip(borde_punto / 2 - np.abs(dist - radio_punto) + 0.5, 0.0, 1.0)
+                ventana = tile[f0:f0 + 2 * r_int + 1, c0:c0 + 2 * r_int + 1]
+                _mezclar(ventana, colores[b], relleno)
+                _mezclar(ventana, blanco, trazo)
+
+        # ===== NÚMEROS =====
+        for elem in range(n):
+            cx, cy = puntos_px[elem]
+            f0 = int(round(cy)) - lado_sprite // 2
+            c0 = int(round(cx)) - lado_sprite // 2
+            ventana = tile[f0:f0 + lado_sprite, c0:c0 + lado_sprite]
+            _mezclar(ventana, blanco, sprites[elem])
+
+        fila, col = divmod(t, cols)
+        atlas[
+            fila * tile_px:(fila + 1) * tile_px,
+            col * tile_px:(col + 1) * tile_px,
+        ] = np.round(
+            tile[relleno_px:relleno_px + tile_px, relleno_px:relleno_px + tile_px] * 255.0
+        ).astype(np.uint8)
+
+    return atlas